@@ -13,14 +13,33 @@ import sys
 sys.path.insert(0, '.')
 
 from src.data_fetcher import (
-    fetch_all_indices, 
+    iter_fetch_indices,
+    iter_fetch_indices_multi_year,
+    build_fetch_status,
     get_available_indices, 
     create_comparison_df,
     update_market_caps,
     INDEX_CONFIGS,
-    FX_RATES_TO_USD
+    FX_RATES_TO_USD,
+    HISTORY_YEARS,
+    get_coalescing_stats,
+    get_cache_stats,
+    get_report_fx_matrix
 )
 from src.insights import generate_insights, generate_next_steps
+from src.prewarm import PrewarmScheduler
+from src.resilience import get_source_states
+from src.http_client import get_http_client
+from src.fx_matrix import REPORT_CURRENCIES
+
+def display_columns(currency: str = "USD") -> list:
+    """Columns shown in the comparison table (raw columns are hidden)."""
+    return [
+        "Region", "Exchange", "Index Name", "YTD % Change",
+        "1M %", "3M %", "6M %", "1Y %", "3Y %", "Volatility (1Y, ann.)",
+        f"Market Cap ({currency})", f"Avg Daily Value ({currency})",
+        f"Avg Daily Value, daily FX ({currency})",
+    ]
 
 # Page configuration
 st.set_page_config(
@@ -91,6 +110,14 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_resource
+def start_prewarm_scheduler() -> PrewarmScheduler:
+    """Start one background pre-warming scheduler per server process."""
+    scheduler = PrewarmScheduler()
+    scheduler.start()
+    return scheduler
+
+
 def init_session_state():
     """Initialize session state variables."""
     if 'fetched_data' not in st.session_state:
@@ -99,6 +126,14 @@ def init_session_state():
         st.session_state.fetch_status = None
     if 'manual_market_caps' not in st.session_state:
         st.session_state.manual_market_caps = {}
+    if 'fetched_by_year' not in st.session_state:
+        st.session_state.fetched_by_year = None
+
+
+def get_year_options() -> list:
+    """Years offered in the sidebar, most recent first."""
+    current_year = datetime.now().year
+    return list(range(current_year, current_year - HISTORY_YEARS, -1))
 
 
 def render_sidebar():
@@ -107,13 +142,28 @@ def render_sidebar():
     
     # Year Selection
     st.sidebar.markdown("### 📅 Analysis Period")
-    current_year = datetime.now().year
     year = st.sidebar.selectbox(
         "Year",
-        options=list(range(current_year, current_year - 5, -1)),
+        options=get_year_options(),
         index=0,
         help="Select year for YTD calculation"
     )
+    preload_years = st.sidebar.checkbox(
+        "Load all years in one pull",
+        value=True,
+        help="Download the full window once per exchange so switching years needs no new fetch"
+    )
+    
+    st.sidebar.markdown("---")
+    
+    # Report Currency
+    st.sidebar.markdown("### 💱 Report Currency")
+    output_currency = st.sidebar.selectbox(
+        "Show values in",
+        options=REPORT_CURRENCIES,
+        index=0,
+        help="Market cap and traded value are converted from USD via cross rates; no refetch needed"
+    )
     
     st.sidebar.markdown("---")
     
@@ -188,10 +238,10 @@ def render_sidebar():
     - ADTV: 📊 Calculated from volume
     """)
     
-    return year, selected_indices, manual_caps
+    return year, selected_indices, manual_caps, preload_years, output_currency
 
 
-def render_fetch_section(year: int, selected_indices: list, manual_caps: dict):
+def render_fetch_section(year: int, selected_indices: list, manual_caps: dict, preload_years: bool):
     """Render the data fetch section."""
     
     st.markdown("### 🔄 Fetch Live Data")
@@ -215,15 +265,63 @@ def render_fetch_section(year: int, selected_indices: list, manual_caps: dict):
             st.error("Please select at least one exchange from the sidebar.")
             return
         
-        with st.spinner(f"Fetching data for {len(selected_indices)} exchanges..."):
-            results, status = fetch_all_indices(selected_indices, year)
+        # Stream results in as each index completes
+        timestamp = datetime.now().isoformat()
+        expected = len({k for k in selected_indices if k in INDEX_CONFIGS})
+        progress = st.progress(0.0, text=f"Fetching data for {len(selected_indices)} exchanges...")
+        table_placeholder = st.empty()
+        status_lines = st.container()
+        
+        if preload_years:
+            stream = iter_fetch_indices_multi_year(selected_indices, get_year_options())
+        else:
+            stream = ({year: result} for result in iter_fetch_indices(selected_indices, year))
+        
+        fetched_by_year = {}
+        for by_year in stream:
+            for result_year, year_result in by_year.items():
+                # Apply manual market cap overrides
+                if manual_caps:
+                    update_market_caps([year_result], manual_caps)
+                fetched_by_year.setdefault(result_year, {})[year_result["key"]] = year_result
             
-            # Apply manual market cap overrides
-            if manual_caps:
-                results = update_market_caps(results, manual_caps)
+            result = by_year[year]
+            fetched = fetched_by_year[year]
             
-            st.session_state.fetched_data = results
-            st.session_state.fetch_status = status
+            with status_lines:
+                if result["fetch_status"] == "success":
+                    st.caption(f"✅ {result['key']}: {result['ytd_percent']:+.2f}% YTD")
+                else:
+                    st.caption(f"❌ {result['key']}: {result.get('error_message', 'Fetch failed')}")
+            
+            partial = [fetched[k] for k in selected_indices if k in fetched]
+            table_placeholder.dataframe(
+                create_comparison_df(partial)[display_columns()],
+                use_container_width=True,
+                hide_index=True
+            )
+            progress.progress(
+                len(fetched) / max(expected, 1),
+                text=f"Fetched {len(fetched)} of {expected} exchanges..."
+            )
+        
+        progress.empty()
+        table_placeholder.empty()
+        
+        by_year_results = {}
+        for result_year in fetched_by_year.keys() | {year}:
+            year_fetched = fetched_by_year.get(result_year, {})
+            year_results = [year_fetched[k] for k in selected_indices if k in year_fetched]
+            by_year_results[result_year] = (
+                year_results,
+                build_fetch_status(selected_indices, year_results, timestamp)
+            )
+        
+        fetched = fetched_by_year.get(year, {})
+        results, status = by_year_results[year]
+        st.session_state.fetched_by_year = by_year_results
+        st.session_state.fetched_data = results
+        st.session_state.fetch_status = status
         
         # Show fetch results
         success_count = len(status.get("success", []))
@@ -234,10 +332,12 @@ def render_fetch_section(year: int, selected_indices: list, manual_caps: dict):
         else:
             st.warning(f"⚠️ Fetched {success_count} exchanges. {failed_count} failed.")
             for fail in status.get("failed", []):
-                st.caption(f"❌ {fail['index']}: {fail['error']}")
+                # Per-index failures were already streamed above
+                if fail["index"] not in fetched:
+                    st.caption(f"❌ {fail['index']}: {fail['error']}")
 
 
-def render_comparison_table(results: list, year: int):
+def render_comparison_table(results: list, year: int, output_currency: str, fx_matrix):
     """Render the main comparison table."""
     
     # Title
@@ -247,7 +347,7 @@ def render_comparison_table(results: list, year: int):
     
     st.markdown(f"""
     <div class="section-title">
-        📊 {exchanges_str} — {year} YTD Overview (All in USD)
+        📊 {exchanges_str} — {year} YTD Overview (All in {output_currency})
     </div>
     """, unsafe_allow_html=True)
     
@@ -256,10 +356,7 @@ def render_comparison_table(results: list, year: int):
         st.caption(f"🕐 Data fetched: {results[0].get('last_updated', 'N/A')}")
     
     # Create display dataframe
-    df = create_comparison_df(results)
-    
-    # Display columns (hide raw columns)
-    display_cols = ["Region", "Exchange", "Index Name", "YTD % Change", "Market Cap (USD)", "Avg Daily Value (USD)"]
+    df = create_comparison_df(results, output_currency, fx_matrix)
     
     # Apply styling based on YTD performance
     def highlight_ytd(val):
@@ -270,7 +367,7 @@ def render_comparison_table(results: list, year: int):
         return ""
     
     st.dataframe(
-        df[display_cols],
+        df[display_columns(output_currency)],
         use_container_width=True,
         hide_index=True,
         height=400
@@ -328,9 +425,14 @@ def render_next_steps_section():
         """, unsafe_allow_html=True)
 
 
-def render_charts(results: list):
+def render_charts(results: list, output_currency: str, fx_matrix):
     """Render visualization charts."""
     
+    # Results are in USD; one cross rate scales them to the report currency
+    usd_to_output = fx_matrix.rate("USD", output_currency)
+    cap_label = f"Market Cap ({output_currency} B)"
+    adtv_label = f"ADTV ({output_currency} M)"
+    
     st.markdown("""
     <div class="section-title">
         📈 Visual Comparison
@@ -376,18 +478,18 @@ def render_charts(results: list):
     with tab2:
         # Market Cap Bar Chart
         cap_data = [
-            {"Exchange": r["exchange"], "Market Cap ($B)": r["market_cap_usd"] / 1e9}
+            {"Exchange": r["exchange"], cap_label: r["market_cap_usd"] * usd_to_output / 1e9}
             for r in results if r.get("market_cap_usd")
         ]
         
         if cap_data:
-            df = pd.DataFrame(cap_data).sort_values("Market Cap ($B)", ascending=True)
+            df = pd.DataFrame(cap_data).sort_values(cap_label, ascending=True)
             
             fig = px.bar(
-                df, y="Exchange", x="Market Cap ($B)",
+                df, y="Exchange", x=cap_label,
                 orientation='h',
-                title="Market Capitalization Comparison (USD Billions)",
-                color="Market Cap ($B)",
+                title=f"Market Capitalization Comparison ({output_currency} Billions)",
+                color=cap_label,
                 color_continuous_scale="Blues"
             )
             fig.update_layout(
@@ -404,18 +506,18 @@ def render_charts(results: list):
     with tab3:
         # ADTV Bar Chart
         adtv_data = [
-            {"Exchange": r["exchange"], "ADTV ($M)": r["adtv_usd"] / 1e6}
+            {"Exchange": r["exchange"], adtv_label: r["adtv_usd"] * usd_to_output / 1e6}
             for r in results if r.get("adtv_usd")
         ]
         
         if adtv_data:
-            df = pd.DataFrame(adtv_data).sort_values("ADTV ($M)", ascending=True)
+            df = pd.DataFrame(adtv_data).sort_values(adtv_label, ascending=True)
             
             fig = px.bar(
-                df, y="Exchange", x="ADTV ($M)",
+                df, y="Exchange", x=adtv_label,
                 orientation='h',
-                title="Average Daily Traded Value (USD Millions)",
-                color="ADTV ($M)",
+                title=f"Average Daily Traded Value ({output_currency} Millions)",
+                color=adtv_label,
                 color_continuous_scale="Greens"
             )
             fig.update_layout(
@@ -430,7 +532,7 @@ def render_charts(results: list):
             st.info("No ADTV data available")
 
 
-def render_data_source_info(results: list, status: dict):
+def render_data_source_info(results: list, status: dict, output_currency: str, fx_matrix, fx_status: str):
     """Render data source and audit information."""
     
     with st.expander("🔎 Data Sources & Audit Trail", expanded=False):
@@ -447,19 +549,84 @@ def render_data_source_info(results: list, status: dict):
         ])
         st.dataframe(source_df, use_container_width=True, hide_index=True)
         
-        st.markdown("### FX Rates Used (to USD)")
+        st.markdown("### Data Quality")
+        quality_rows = [
+            {
+                "Exchange": r["exchange"],
+                "Missing Days": r["quality"].get("missing_sessions"),
+                "Longest Flat Run": r["quality"].get("max_flat_sessions"),
+                "Zero-Volume Days": r["quality"].get("zero_volume_sessions"),
+                "Outlier Returns": r["quality"].get("outlier_returns"),
+                "Flags": "; ".join(r.get("quality_flags", [])) or "✅ None",
+            }
+            for r in results
+            if r.get("quality")
+        ]
+        if quality_rows:
+            st.dataframe(pd.DataFrame(quality_rows), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No price histories checked yet")
+        
+        st.markdown(f"### FX Rates Used (to {output_currency})")
         fx_df = pd.DataFrame([
-            {"Currency": curr, "Rate to USD": rate}
-            for curr, rate in FX_RATES_TO_USD.items()
+            {"Currency": curr, f"Rate to {output_currency}": rate}
+            for curr, rate in fx_matrix.rates_to(output_currency).items()
         ])
         st.dataframe(fx_df, use_container_width=True, hide_index=True)
+        st.caption(f"Local values are converted with static rates to USD; report currency: {fx_status}")
         
         if status:
             st.markdown("### Fetch Status")
             st.json(status)
+        
+        st.markdown("### Upstream Sources")
+        source_states = get_source_states()
+        if source_states:
+            breaker_df = pd.DataFrame([
+                {
+                    "Source": s["source"],
+                    "Circuit": s["state"],
+                    "Trips": s["trips"],
+                    "Calls": s["calls"],
+                    "Failures": s["failures"],
+                    "Client Errors": s["client_errors"],
+                    "Rejected (fail-fast)": s["rejected"],
+                    "p50 Latency (s)": s["p50_latency_s"],
+                    "p95 Latency (s)": s["p95_latency_s"],
+                    "Timeout (s)": s["timeout_s"],
+                }
+                for s in source_states
+            ])
+            st.dataframe(breaker_df, use_container_width=True, hide_index=True)
+        else:
+            st.caption("No upstream calls made yet")
+        
+        st.markdown("### Background Pre-Warming")
+        prewarm_df = pd.DataFrame([
+            {
+                "Index": key,
+                "Next Refresh (UTC)": info.get("next_run", "N/A"),
+                "Last Refresh (UTC)": info.get("last_run", "N/A"),
+                "Last Status": info.get("last_status", "N/A"),
+            }
+            for key, info in start_prewarm_scheduler().status().items()
+        ])
+        st.dataframe(prewarm_df, use_container_width=True, hide_index=True)
+        
+        coalescing = get_coalescing_stats()
+        cache = get_cache_stats()
+        http = get_http_client().stats()
+        st.caption(
+            f"Upstream history syncs: {coalescing['calls']} run, "
+            f"{coalescing['shared']} shared with concurrent sessions | "
+            f"Shared cache: {cache['hits']} fresh hits, {cache['stale_hits']} stale hits, "
+            f"{cache['misses']} misses, {cache['entries']} entries | "
+            f"HTTP: {http['calls']} calls, {http['retries']} retries, "
+            f"{http['connections_reused']} reused / {http['connections_opened']} new connections"
+        )
 
 
-def render_downloads(results: list, year: int):
+def render_downloads(results: list, year: int, output_currency: str, fx_matrix):
     """Render download buttons."""
     
     st.markdown("### 📥 Download Data")
@@ -468,7 +635,7 @@ def render_downloads(results: list, year: int):
     
     with col1:
         # CSV Download
-        df = create_comparison_df(results)
+        df = create_comparison_df(results, output_currency, fx_matrix)
         csv_data = df.to_csv(index=False)
         st.download_button(
             "⬇️ Download CSV",
@@ -485,6 +652,8 @@ def render_downloads(results: list, year: int):
                 "generated_at": datetime.now().isoformat(),
                 "year": year,
                 "fx_rates": FX_RATES_TO_USD,
+                "output_currency": output_currency,
+                "fx_rates_to_output": fx_matrix.rates_to(output_currency),
             },
             "exchanges": results
         }
@@ -501,29 +670,36 @@ def render_downloads(results: list, year: int):
 def main():
     """Main application entry point."""
     init_session_state()
+    start_prewarm_scheduler()
     
     # Header
     st.title("📊 Exchange Comparison Dashboard")
     st.markdown("*Compare DFM, ADX, Tadawul and global exchanges — with live data from Yahoo Finance*")
     
     # Sidebar
-    year, selected_indices, manual_caps = render_sidebar()
+    year, selected_indices, manual_caps, preload_years, output_currency = render_sidebar()
+    
+    # Switching years reuses the multi-year pull without any network request
+    by_year = st.session_state.fetched_by_year
+    if by_year and year in by_year:
+        st.session_state.fetched_data, st.session_state.fetch_status = by_year[year]
     
     # Main content
     st.markdown("---")
     
     # Fetch Section
-    render_fetch_section(year, selected_indices, manual_caps)
+    render_fetch_section(year, selected_indices, manual_caps, preload_years)
     
     # Results Section
     if st.session_state.fetched_data:
         results = st.session_state.fetched_data
         status = st.session_state.fetch_status
+        fx_matrix, fx_status = get_report_fx_matrix(output_currency)
         
         st.markdown("---")
         
         # Main Table
-        df = render_comparison_table(results, year)
+        df = render_comparison_table(results, year, output_currency, fx_matrix)
         
         st.markdown("---")
         
@@ -539,17 +715,17 @@ def main():
         st.markdown("---")
         
         # Charts
-        render_charts(results)
+        render_charts(results, output_currency, fx_matrix)
         
         st.markdown("---")
         
         # Data Sources
-        render_data_source_info(results, status)
+        render_data_source_info(results, status, output_currency, fx_matrix, fx_status)
         
         st.markdown("---")
         
         # Downloads
-        render_downloads(results, year)
+        render_downloads(results, year, output_currency, fx_matrix)
     
     else:
         # Show instructions if no data yet
@@ -0,0 +1,277 @@
+"""
+Local mock market-data server for benchmarks.
+Stands in for Investing.com (as a JSON history API), exchangerate.host
+(convert, latest, timeseries), frankfurter.app (latest, date ranges) and
+the exchange homepages, with configurable latency, jitter and error
+injection.
+
+Run standalone as a local FX API for the app or load tests:
+    python -m benchmarks.mock_server --port 8765 --fx-csv data/fx_sample.csv
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+FX_SAMPLE_PATH = Path(__file__).resolve().parent.parent / "data" / "fx_sample.csv"
+
+# First date of the generated synthetic index histories
+HISTORY_START = date(2020, 1, 1)
+
+
+def load_sample_fx_history(path: Path = FX_SAMPLE_PATH) -> pd.DataFrame:
+    """Daily rates to USD per currency (indexed by ISO date) from an FX CSV with columns like 'AEDUSD'."""
+    df = pd.read_csv(path).sort_values("date").set_index("date")
+    df = df[[col for col in df.columns if col.endswith("USD") and len(col) == 6]]
+    df.columns = [col[:-3] for col in df.columns]
+    df["USD"] = 1.0
+    return df
+
+
+def load_sample_fx_rates(path: Path = FX_SAMPLE_PATH) -> Dict[str, float]:
+    """Latest rate to USD per currency from an FX CSV (columns like 'AEDUSD')."""
+    return {currency: float(rate) for currency, rate in load_sample_fx_history(path).iloc[-1].items()}
+
+
+class MockMarketState:
+    """Shared configuration and deterministic data for the mock server."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        route_latency: Dict[str, float] = None,
+        fx_path: Path = FX_SAMPLE_PATH,
+    ):
+        self.latency = latency
+        # Extra latency per route (first path segment, e.g. "exchangerate")
+        self.route_latency = dict(route_latency or {})
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fx_history = load_sample_fx_history(fx_path)
+        self.fx_rates = {currency: float(rate) for currency, rate in self.fx_history.iloc[-1].items()}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._histories: Dict[str, pd.DataFrame] = {}
+        self.request_counts: Dict[str, int] = {}
+
+    def simulate(self, route: str) -> bool:
+        """Sleep for the configured latency; return True if this request should fail."""
+        with self._lock:
+            delay = self.latency + self.route_latency.get(route, 0.0) + self._rng.uniform(0.0, self.jitter)
+            failed = self._rng.random() < self.error_rate
+            self.request_counts[route] = self.request_counts.get(route, 0) + 1
+        if delay > 0:
+            time.sleep(delay)
+        return failed
+
+    def history(self, index_name: str) -> pd.DataFrame:
+        """Deterministic synthetic daily OHLCV for an index name."""
+        with self._lock:
+            cached = self._histories.get(index_name)
+        if cached is not None:
+            return cached
+
+        rng = np.random.default_rng(zlib.crc32(index_name.encode("utf-8")))
+        dates = pd.bdate_range(HISTORY_START, date.today())
+        close = 1000 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, len(dates))))
+        spread = np.abs(rng.normal(0, 0.004, len(dates))) * close
+        df = pd.DataFrame({
+            "Open": close - spread / 2,
+            "High": close + spread,
+            "Low": close - spread,
+            "Close": close,
+            "Volume": rng.integers(1_000_000, 50_000_000, len(dates)).astype(float),
+        }, index=dates)
+
+        with self._lock:
+            self._histories[index_name] = df
+        return df
+
+
+class MockMarketHandler(BaseHTTPRequestHandler):
+    """Routes requests to the stand-in endpoints."""
+
+    state: MockMarketState = None
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def _send(self, status: int, body: str, content_type: str = "application/json"):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        route = parsed.path.rstrip("/").split("/")[1] if parsed.path.count("/") else ""
+
+        if self.state.simulate(route):
+            self._send(503, json.dumps({"error": "injected failure"}))
+            return
+
+        if parsed.path == "/investing/history":
+            self._history(params)
+        elif parsed.path == "/investing/search":
+            self._send(200, json.dumps([]))
+        elif parsed.path == "/exchangerate/convert":
+            self._convert(params)
+        elif parsed.path in ("/exchangerate/latest", "/frankfurter/latest"):
+            self._latest(params)
+        elif parsed.path == "/exchangerate/timeseries":
+            self._timeseries(params.get("start_date", ""), params.get("end_date", ""), params)
+        elif parsed.path.startswith("/frankfurter/") and ".." in parsed.path:
+            start, _, end = parsed.path.rsplit("/", 1)[1].partition("..")
+            self._timeseries(start, end, params)
+        elif parsed.path.startswith("/exchange/"):
+            self._homepage(parsed.path.split("/", 2)[2])
+        else:
+            self._send(404, json.dumps({"error": "not found"}))
+
+    def _history(self, params: Dict[str, str]):
+        df = self.state.history(params.get("index", ""))
+        window = df.loc[params.get("from"):params.get("to")]
+        rows = [
+            [ts.strftime("%Y-%m-%d"), *values]
+            for ts, values in zip(window.index, window.to_numpy().tolist())
+        ]
+        self._send(200, json.dumps({"columns": list(df.columns), "rows": rows}))
+
+    def _cross_rate(self, base: str, quote: str) -> Optional[float]:
+        rates = self.state.fx_rates
+        if base not in rates or quote not in rates:
+            return None
+        return rates[base] / rates[quote]
+
+    def _convert(self, params: Dict[str, str]):
+        rate = self._cross_rate(params.get("from", ""), params.get("to", ""))
+        self._send(200, json.dumps({"success": rate is not None, "result": rate}))
+
+    def _latest(self, params: Dict[str, str]):
+        # exchangerate.host uses base/symbols, frankfurter.app from/to
+        base = params.get("base") or params.get("from", "EUR")
+        quotes = (params.get("symbols") or params.get("to", "USD")).split(",")
+        rates = {q: self._cross_rate(base, q) for q in quotes}
+        self._send(200, json.dumps({"base": base, "rates": {q: r for q, r in rates.items() if r is not None}}))
+
+    def _timeseries(self, start: str, end: str, params: Dict[str, str]):
+        base = params.get("base") or params.get("from", "EUR")
+        quotes = (params.get("symbols") or params.get("to", "USD")).split(",")
+        history = self.state.fx_history
+        if base not in history.columns:
+            self._send(200, json.dumps({"success": False, "rates": {}}))
+            return
+        window = history.loc[start:end]
+        rates = {
+            day: {q: row[base] / row[q] for q in quotes if q in history.columns}
+            for day, row in window.iterrows()
+        }
+        self._send(200, json.dumps({"base": base, "start_date": start, "end_date": end, "rates": rates}))
+
+    def _homepage(self, exchange: str):
+        df = self.state.history(exchange)
+        last, first = df["Close"].iloc[-1], df["Close"].iloc[0]
+        html = (
+            f"<html><body><h1>{exchange}</h1>"
+            f"<div class='index-value'>{last:,.2f}</div>"
+            f"<td class='market-cap'>{df['Volume'].iloc[-1] * 1000:,.0f}</td>"
+            f"<span class='ytd-percent'>{(last / first - 1) * 100:+.2f}%</span>"
+            f"</body></html>"
+        )
+        self._send(200, html, "text/html")
+
+
+class MockMarketServer:
+    """Threaded mock server bound to a free local port."""
+
+    def __init__(self, state: MockMarketState, host: str = "127.0.0.1", port: int = 0):
+        handler = type("BoundMockMarketHandler", (MockMarketHandler,), {"state": state})
+        self.state = state
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def fx_provider_urls(self) -> Dict[str, str]:
+        """Base URLs of the FX stand-ins, as keyword arguments for fx.set_fx_provider_urls."""
+        return {
+            "exchangerate_host": f"{self.base_url}/exchangerate",
+            "frankfurter": f"{self.base_url}/frankfurter",
+        }
+
+    def start(self) -> "MockMarketServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def homepage_configs(self, exchanges: List[str]) -> List[Dict]:
+        """Extraction configs pointing at the mock exchange homepages."""
+        return [
+            {
+                "url": f"{self.base_url}/exchange/{name}",
+                "exchange": name,
+                "selectors": {
+                    "index_value": "div.index-value",
+                    "market_cap": "td.market-cap",
+                    "ytd_change": "span.ytd-percent",
+                },
+            }
+            for name in exchanges
+        ]
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Serve stand-in FX and market-data APIs locally")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8765, help="Port to bind (0 picks a free one)")
+    parser.add_argument("--fx-csv", type=Path, default=FX_SAMPLE_PATH, help="Daily FX CSV with a 'date' column and 'AEDUSD'-style columns")
+    parser.add_argument("--latency", type=float, default=0.0, help="Base latency per request (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an injected HTTP 503")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency/error injection")
+    args = parser.parse_args(argv)
+
+    state = MockMarketState(args.latency, args.jitter, args.error_rate, args.seed, fx_path=args.fx_csv)
+    server = MockMarketServer(state, args.host, args.port).start()
+    urls = server.fx_provider_urls
+    print(f"Serving on {server.base_url} (FX rates {state.fx_history.index[0]} to {state.fx_history.index[-1]})")
+    print("Point the app at it with:")
+    print(f"  export FX_EXCHANGERATE_HOST_URL={urls['exchangerate_host']}")
+    print(f"  export FX_FRANKFURTER_URL={urls['frankfurter']}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+End-to-end benchmark harness.
+Drives the fetch pipeline, FX lookups and homepage extraction against the
+local mock server and reports latency percentiles, throughput and wall time.
+
+Usage:
+    python -m benchmarks.run_benchmarks --indices 10 100 1000 --latency 0.05
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src import data_fetcher, fx, history_store
+from src.data_fetcher import (
+    INDEX_CONFIGS,
+    configure_index_cache,
+    create_comparison_df,
+    iter_fetch_indices_multi_year,
+)
+from src.extraction import try_extract_from_config
+from src.fx_cache import FXRateCache, set_fx_cache
+from src.fx_history import FXHistoryStore, set_fx_history_store
+from src.http_client import get_http_client
+from src.insights import generate_insights
+from src.providers import MarketDataProvider
+from src.rate_limit import get_rate_limiter, set_rate_limit
+
+from .mock_server import MockMarketServer, MockMarketState
+
+BENCH_PREFIX = "BENCH_"
+FX_CURRENCIES = ["AED", "SAR", "KWD", "QAR", "GBP", "EUR", "JPY", "HKD"]
+FX_ROUTES = ("exchangerate", "frankfurter")
+
+
+class MockServerProvider(MarketDataProvider):
+    """Provider reading index histories from the mock server's JSON API."""
+
+    unavailable_message = "Mock market server not running"
+
+    def __init__(self, base_url: str, name: str = "mock"):
+        self.base_url = base_url
+        self.name = name
+        self.host = base_url.split("://", 1)[-1]
+        self._lock = threading.Lock()
+        self.request_latencies: List[float] = []
+
+    def source_label(self, index_name: str) -> str:
+        return f"Mock server ({index_name})"
+
+    def get_index_history(
+        self,
+        index_name: str,
+        country: str,
+        from_date: date,
+        to_date: date,
+        timeout: Optional[float] = None,
+    ) -> pd.DataFrame:
+        get_rate_limiter(self.host).acquire()
+        started = time.perf_counter()
+        try:
+            response = get_http_client().get(
+                f"{self.base_url}/investing/history",
+                params={"index": index_name, "country": country, "from": from_date.isoformat(), "to": to_date.isoformat()},
+                timeout=timeout or 30,
+                deadline=timeout,
+            )
+            response.raise_for_status()
+            payload = response.json()
+        finally:
+            with self._lock:
+                self.request_latencies.append(time.perf_counter() - started)
+
+        rows = payload["rows"]
+        df = pd.DataFrame([row[1:] for row in rows], columns=payload["columns"])
+        df.index = pd.DatetimeIndex([row[0] for row in rows], name="Date")
+        return df
+
+    def search_indices(self, country: str = None) -> List[Dict]:
+        response = get_http_client().get(f"{self.base_url}/investing/search", timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+
+def register_bench_indices(count: int) -> List[str]:
+    """Add `count` synthetic USD indices to INDEX_CONFIGS and return their keys."""
+    keys = []
+    for i in range(count):
+        key = f"{BENCH_PREFIX}{i:04d}"
+        INDEX_CONFIGS[key] = {
+            "investpy_name": f"Bench Index {i:04d}",
+            "country": "united states",
+            "name": f"Bench Index {i:04d}",
+            "region": "Benchmark",
+            "exchange_display": f"BENCH {i:04d}",
+            "local_currency": "USD",
+            "estimated_market_cap_usd": 1_000_000_000 * (i + 1),
+            "timezone": "America/New_York",
+            "market_close": "16:00",
+            "trading_days": "Mon Tue Wed Thu Fri",
+        }
+        keys.append(key)
+    return keys
+
+
+def unregister_bench_indices():
+    for key in [k for k in INDEX_CONFIGS if k.startswith(BENCH_PREFIX)]:
+        del INDEX_CONFIGS[key]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 of samples in milliseconds (NaN if empty)."""
+    if not samples:
+        return {"p50_ms": float("nan"), "p95_ms": float("nan"), "p99_ms": float("nan")}
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+def run_fetch_scenario(keys: List[str], provider: MockServerProvider, years: List[int], workers: int) -> Dict:
+    """Fetch every index once, timing each index's completion and every request."""
+    provider.request_latencies.clear()
+    completions = []
+    results = []
+    started = time.perf_counter()
+    for by_year in iter_fetch_indices_multi_year(keys, years, workers, provider):
+        completions.append(time.perf_counter() - started)
+        results.append(by_year[max(years)])
+    wall = time.perf_counter() - started
+
+    return {
+        "indices": len(keys),
+        "ok": sum(1 for r in results if r.get("fetch_status") == "success"),
+        "requests": len(provider.request_latencies),
+        "wall_s": wall,
+        "indices_per_s": len(keys) / wall if wall > 0 else float("inf"),
+        "request": percentiles(provider.request_latencies),
+        "completion": percentiles(completions),
+        "results": results,
+    }
+
+
+def bench_fetch(server: MockMarketServer, counts: List[int], workers: int, years: List[int]) -> List[Dict]:
+    """Cold, warm-store and cached fetch scenarios for each index count."""
+    rows = []
+    for count in counts:
+        unregister_bench_indices()
+        keys = register_bench_indices(count)
+        # A fresh provider name gets an empty history store namespace
+        provider = MockServerProvider(server.base_url, name=f"mock-{count}-{time.time_ns()}")
+
+        configure_index_cache()
+        cold = run_fetch_scenario(keys, provider, years, workers)
+        # Drop the in-process cache; the history store only needs the tail delta
+        configure_index_cache()
+        warm = run_fetch_scenario(keys, provider, years, workers)
+        cached = run_fetch_scenario(keys, provider, years, workers)
+
+        for scenario, stats in (("cold", cold), ("warm store", warm), ("cached", cached)):
+            rows.append({"scenario": scenario, **stats})
+
+        started = time.perf_counter()
+        create_comparison_df(cold["results"])
+        generate_insights(cold["results"], max(years))
+        rows.append({
+            "scenario": "compare+insights",
+            "indices": count,
+            "ok": len(cold["results"]),
+            "requests": 0,
+            "wall_s": time.perf_counter() - started,
+            "indices_per_s": float("nan"),
+            "request": percentiles([]),
+            "completion": percentiles([]),
+        })
+    unregister_bench_indices()
+    return rows
+
+
+def bench_fx(server: MockMarketServer, rounds: int) -> Dict:
+    """Time live FX lookups for the dashboard currencies (first round cold)."""
+    # In-memory cache: the first round is cold, later rounds hit the cache
+    set_fx_cache(FXRateCache(path=None))
+    requests_before = sum(server.state.request_counts.get(route, 0) for route in FX_ROUTES)
+    timings = []
+    resolved = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        rates, _ = fx.get_live_fx_rates(FX_CURRENCIES)
+        timings.append(time.perf_counter() - started)
+        resolved = sum(1 for rate in rates.values() if rate is not None)
+    requests = sum(server.state.request_counts.get(route, 0) for route in FX_ROUTES) - requests_before
+    return {"rounds": rounds, "resolved": resolved, "of": len(FX_CURRENCIES), "requests": requests, **percentiles(timings)}
+
+
+def bench_extraction(server: MockMarketServer, exchanges: int) -> Dict:
+    """Time homepage extraction against the mock exchange pages."""
+    configs = server.homepage_configs([f"EX{i:03d}" for i in range(exchanges)])
+    timings = []
+    ok = 0
+    for config in configs:
+        started = time.perf_counter()
+        _, status = try_extract_from_config(config)
+        timings.append(time.perf_counter() - started)
+        ok += status == "Success"
+    return {"pages": len(configs), "ok": ok, **percentiles(timings)}
+
+
+def format_report(fetch_rows: List[Dict], fx_stats: Dict, extraction_stats: Dict, settings: Dict) -> str:
+    lines = [
+        f"Benchmark run {datetime.now().isoformat(timespec='seconds')}",
+        "Settings: " + ", ".join(f"{k}={v}" for k, v in settings.items()),
+        "",
+        f"{'scenario':<18}{'indices':>8}{'ok':>7}{'reqs':>7}{'wall s':>9}{'idx/s':>9}"
+        f"{'req p50':>9}{'req p95':>9}{'req p99':>9}{'done p50':>10}{'done p95':>10}{'done p99':>10}",
+    ]
+    for row in fetch_rows:
+        req, done = row["request"], row["completion"]
+        lines.append(
+            f"{row['scenario']:<18}{row['indices']:>8}{row['ok']:>7}{row['requests']:>7}"
+            f"{row['wall_s']:>9.2f}{row['indices_per_s']:>9.1f}"
+            f"{req['p50_ms']:>9.1f}{req['p95_ms']:>9.1f}{req['p99_ms']:>9.1f}"
+            f"{done['p50_ms']:>10.1f}{done['p95_ms']:>10.1f}{done['p99_ms']:>10.1f}"
+        )
+    lines += [
+        "",
+        "Latencies in ms; 'done' is time from start until each index's result was ready.",
+        "",
+        f"FX live rates ({fx_stats['rounds']} rounds, {fx_stats['resolved']}/{fx_stats['of']} resolved, "
+        f"{fx_stats['requests']} provider requests): "
+        f"p50 {fx_stats['p50_ms']:.1f} ms, p95 {fx_stats['p95_ms']:.1f} ms, p99 {fx_stats['p99_ms']:.1f} ms",
+        f"Homepage extraction ({extraction_stats['ok']}/{extraction_stats['pages']} ok): "
+        f"p50 {extraction_stats['p50_ms']:.1f} ms, p95 {extraction_stats['p95_ms']:.1f} ms, "
+        f"p99 {extraction_stats['p99_ms']:.1f} ms",
+        "HTTP client: " + ", ".join(f"{k}={v}" for k, v in get_http_client().stats().items()),
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> str:
+    parser = argparse.ArgumentParser(description="Benchmark the fetch pipeline against a local mock server")
+    parser.add_argument("--indices", type=int, nargs="+", default=[10, 100, 1000], help="Index counts to benchmark")
+    parser.add_argument("--workers", type=int, default=data_fetcher.MAX_FETCH_WORKERS, help="Fetch worker threads")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock server base latency (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Mock server extra random latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an injected HTTP 503")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Requests/second allowed to the mock host")
+    parser.add_argument("--years", type=int, default=data_fetcher.HISTORY_YEARS, help="Calendar years per index")
+    parser.add_argument("--fx-rounds", type=int, default=5, help="Repetitions of the FX lookup")
+    parser.add_argument("--fx-primary-latency", type=float, default=0.0, help="Extra latency of the primary FX provider (seconds), to exercise hedging")
+    parser.add_argument("--pages", type=int, default=10, help="Mock homepages to extract")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency/error injection")
+    parser.add_argument("--output", type=Path, default=None, help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    current_year = datetime.now().year
+    years = list(range(current_year, current_year - args.years, -1))
+
+    # Keep the benchmark's history store out of the real data directory
+    history_store.HISTORY_DIR = Path(tempfile.mkdtemp(prefix="bench-history-"))
+    set_fx_history_store(FXHistoryStore(Path(tempfile.mkdtemp(prefix="bench-fx-")) / "fx_history.csv"))
+
+    state = MockMarketState(
+        args.latency, args.jitter, args.error_rate, args.seed,
+        route_latency={"exchangerate": args.fx_primary_latency},
+    )
+    server = MockMarketServer(state).start()
+    fx.set_fx_provider_urls(**server.fx_provider_urls)
+    set_rate_limit(server.base_url.split("://", 1)[-1], args.rate, args.rate)
+    try:
+        fetch_rows = bench_fetch(server, args.indices, args.workers, years)
+        fx_stats = bench_fx(server, args.fx_rounds)
+        extraction_stats = bench_extraction(server, args.pages)
+    finally:
+        server.stop()
+
+    settings = {
+        "workers": args.workers,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "rate": args.rate,
+        "years": args.years,
+        "fx_primary_latency": args.fx_primary_latency,
+    }
+    report = format_report(fetch_rows, fx_stats, extraction_stats, settings)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,10 @@ With auto-fetch data capabilities
 
 from .data_fetcher import (
     fetch_all_indices,
+    iter_fetch_indices,
+    iter_fetch_indices_multi_year,
+    fetch_all_years,
+    build_fetch_status,
     get_available_indices,
     create_comparison_df,
     update_market_caps,
@@ -13,6 +17,14 @@ from .data_fetcher import (
     IndexData,
 )
 
+from .providers import (
+    MarketDataProvider,
+    InvestpyProvider,
+    FixtureProvider,
+    get_provider,
+    set_provider,
+)
+
 from .insights import (
     generate_insights,
     generate_next_steps,
@@ -20,8 +32,10 @@ from .insights import (
 )
 
 __all__ = [
-    'fetch_all_indices', 'get_available_indices',
+    'fetch_all_indices', 'iter_fetch_indices', 'iter_fetch_indices_multi_year',
+    'fetch_all_years', 'build_fetch_status', 'get_available_indices',
     'create_comparison_df', 'update_market_caps',
     'INDEX_CONFIGS', 'FX_RATES_TO_USD', 'IndexData',
+    'MarketDataProvider', 'InvestpyProvider', 'FixtureProvider', 'get_provider', 'set_provider',
     'generate_insights', 'generate_next_steps', 'generate_executive_summary',
 ]
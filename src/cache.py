@@ -0,0 +1,151 @@
+"""
+In-process cache module.
+A thread-safe TTL cache with LRU eviction under a memory bound and
+stale-while-revalidate refreshes, shared by every session in the process.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    TTL cache with stale-while-revalidate.
+
+    - Entries younger than `ttl` are served as-is.
+    - Entries older than `ttl` but younger than `ttl + stale_ttl` are served
+      immediately while one background refresh per key reloads them.
+    - Older entries are reloaded synchronously.
+    - Total weight (see `weigher`, default 1 per entry) is kept under
+      `max_weight` by evicting least-recently-used entries.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        max_weight: float = 128,
+        weigher: Callable[[Any], float] = None,
+        refresh_workers: int = 2,
+    ):
+        """
+        Args:
+            ttl: Seconds an entry is fresh
+            stale_ttl: Extra seconds an expired entry may still be served
+            max_weight: Upper bound on the summed weight of cached values
+            weigher: Callable returning a value's weight (e.g. bytes)
+            refresh_workers: Threads used for background refreshes
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_weight = max_weight
+        self.weigher = weigher or (lambda value: 1)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, stored_at, weight)
+        self._weight = 0.0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="cache-refresh")
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "refreshes": 0, "refresh_errors": 0}
+
+    def _put_locked(self, key: Hashable, value: Any):
+        weight = self.weigher(value)
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._weight -= old[2]
+        if weight > self.max_weight:
+            # Larger than the whole budget: do not cache
+            return
+        self._data[key] = (value, time.monotonic(), weight)
+        self._weight += weight
+        while self._weight > self.max_weight and self._data:
+            _, (_, _, evicted_weight) = self._data.popitem(last=False)
+            self._weight -= evicted_weight
+            self._stats["evictions"] += 1
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value as fresh."""
+        with self._lock:
+            self._put_locked(key, value)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a cached value (fresh or stale) without loading, or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[1] >= self.ttl + self.stale_ttl:
+                return None
+            return entry[0]
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._weight -= old[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._weight = 0.0
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any], should_cache: Callable[[Any], bool]):
+        try:
+            value = loader()
+            with self._lock:
+                self._stats["refreshes"] += 1
+                if should_cache(value):
+                    self._put_locked(key, value)
+        except Exception:
+            # Keep serving the stale entry; the next read retries
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        should_cache: Callable[[Any], bool] = None,
+    ) -> Any:
+        """
+        Return the cached value for key, loading it if missing or too old.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument callable producing the value
+            should_cache: Predicate deciding whether a loaded value is stored
+                (e.g. skip failures); defaults to caching everything
+        """
+        should_cache = should_cache or (lambda value: True)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at, _ = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self._data.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._data.move_to_end(key)
+                    self._stats["stale_hits"] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._executor.submit(self._refresh, key, loader, should_cache)
+                    return value
+            self._stats["misses"] += 1
+
+        value = loader()
+        if should_cache(value):
+            self.put(key, value)
+        return value
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss/eviction counters plus current size and weight."""
+        with self._lock:
+            return {**self._stats, "entries": len(self._data), "weight": self._weight}
@@ -0,0 +1,76 @@
+"""
+Trading calendar module.
+Each exchange's sessions are precomputed once as a sorted date array
+(weekmask minus holidays), so session lookups are binary searches.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+
+# Range covered by generated calendars
+CALENDAR_START_YEAR = 2000
+CALENDAR_YEARS_AHEAD = 2
+
+DEFAULT_WEEKMASK = "Mon Tue Wed Thu Fri"
+
+
+@dataclass(frozen=True, eq=False)
+class TradingCalendar:
+    """Sorted trading sessions of one exchange (compared by identity)."""
+
+    sessions: np.ndarray  # sorted datetime64[D]
+
+    def first_on_or_after(self, day: date) -> np.datetime64:
+        """First session on or after `day` (NaT if beyond the calendar)."""
+        i = np.searchsorted(self.sessions, np.datetime64(day, "D"), side="left")
+        return self.sessions[i] if i < len(self.sessions) else np.datetime64("NaT", "D")
+
+    def count(self, start, end) -> np.ndarray:
+        """Sessions in [start, end] inclusive; accepts scalars or date arrays."""
+        start = np.asarray(start, dtype="datetime64[D]")
+        end = np.asarray(end, dtype="datetime64[D]")
+        counts = (
+            np.searchsorted(self.sessions, end, side="right")
+            - np.searchsorted(self.sessions, start, side="left")
+        )
+        return np.maximum(counts, 0)
+
+
+def _holiday_dates(holidays: Tuple[str, ...], first_year: int, last_year: int) -> np.ndarray:
+    """Expand "MM-DD" (every year) and "YYYY-MM-DD" (one-off) holidays to dates."""
+    days = []
+    for holiday in holidays:
+        if len(holiday) == 5:
+            days.extend(f"{year}-{holiday}" for year in range(first_year, last_year + 1))
+        else:
+            days.append(holiday)
+    valid = []
+    for day in days:
+        try:
+            valid.append(np.datetime64(day, "D"))
+        except ValueError:
+            # e.g. 02-29 in non-leap years
+            continue
+    return np.array(sorted(valid), dtype="datetime64[D]")
+
+
+@lru_cache(maxsize=None)
+def build_calendar(weekmask: str = DEFAULT_WEEKMASK, holidays: Tuple[str, ...] = ()) -> TradingCalendar:
+    """Generate (and cache) the calendar for a weekmask and holiday list."""
+    first_year = CALENDAR_START_YEAR
+    last_year = date.today().year + CALENDAR_YEARS_AHEAD
+    days = np.arange(
+        np.datetime64(f"{first_year}-01-01", "D"),
+        np.datetime64(f"{last_year + 1}-01-01", "D"),
+    )
+    is_session = np.is_busday(days, weekmask=weekmask, holidays=_holiday_dates(holidays, first_year, last_year))
+    return TradingCalendar(sessions=days[is_session])
+
+
+def calendar_for(config: Dict) -> TradingCalendar:
+    """Trading calendar of an INDEX_CONFIGS entry (trading_days and holidays)."""
+    return build_calendar(config.get("trading_days") or DEFAULT_WEEKMASK, tuple(config.get("holidays", ())))
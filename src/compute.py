@@ -3,6 +3,8 @@ Computation module for exchange metrics conversion and comparison.
 All calculations are deterministic using pandas.
 """
 
+import math
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
@@ -10,7 +12,7 @@ from .schemas import (
     ExchangeInput, ExchangeOutput, FXConfiguration, FXRate,
     DateRange, AuditRecord, ComparisonResult, CURRENCY_SYMBOLS
 )
-from .fx import get_fx_rates, convert_to_usd
+from .fx import get_fx_rates
 
 
 def format_market_cap(value: Optional[float], currency_symbol: str = "$") -> str:
@@ -92,13 +94,15 @@ def compute_exchange_outputs(
         date_range: Date range for the comparison
     
     Returns:
-        Tuple of (outputs, audit_records, fx_rates_used, status_message)
+        Tuple of (outputs, audit_records, fx_rates_used, status_message);
+        fx_rates_used are validated FXRate models, one per currency
     """
     # Get required currencies
-    required_currencies = list(set(
+    currencies = [
         inp.local_currency if isinstance(inp.local_currency, str) else inp.local_currency.value
         for inp in inputs
-    ))
+    ]
+    required_currencies = list(set(currencies))
     
     # Fetch FX rates
     fx_rates, fx_status = get_fx_rates(
@@ -107,16 +111,22 @@ def compute_exchange_outputs(
         (date_range.start_date, date_range.end_date)
     )
     
+    # One rate per row (NaN where missing); market cap and ADTV of every
+    # row are converted in a single broadcast
+    factors = np.array([fx_rates[c].rate if c in fx_rates else np.nan for c in currencies])
+    local_values = np.array(
+        [[inp.market_cap_local, inp.adtv_local] for inp in inputs], dtype=float
+    ).reshape(-1, 2)
+    converted = (local_values * factors[:, None]).tolist()
+    computed_at = datetime.utcnow()
+    
     outputs = []
     audit_records = []
     
-    for inp in inputs:
-        currency = inp.local_currency if isinstance(inp.local_currency, str) else inp.local_currency.value
+    for inp, currency, (market_cap_usd, adtv_usd) in zip(inputs, currencies, converted):
         fx_rate = fx_rates.get(currency)
-        
-        # Calculate USD values
-        market_cap_usd = convert_to_usd(inp.market_cap_local, fx_rate)
-        adtv_usd = convert_to_usd(inp.adtv_local, fx_rate)
+        market_cap_usd = None if math.isnan(market_cap_usd) else market_cap_usd
+        adtv_usd = None if math.isnan(adtv_usd) else adtv_usd
         
         # Track missing fields
         missing_fields = []
@@ -161,11 +171,13 @@ def compute_exchange_outputs(
             fx_source=fx_rate.source if fx_rate else "N/A",
             output_market_cap_usd=market_cap_usd,
             output_adtv_usd=adtv_usd,
+            computed_at=computed_at,
             missing_fields=missing_fields
         )
         audit_records.append(audit)
     
-    return outputs, audit_records, fx_rates, fx_status
+    # Validate the rates once each at the output boundary
+    return outputs, audit_records, {c: r.to_model() for c, r in fx_rates.items()}, fx_status
 
 
 def create_comparison_dataframe(outputs: List[ExchangeOutput]) -> pd.DataFrame:
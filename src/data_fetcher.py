@@ -3,19 +3,25 @@ Data Fetcher Module - Using Investpy (Investing.com)
 FREE data source with NO rate limits for global indices including GCC markets.
 """
 
+import numpy as np
 import pandas as pd
 import streamlit as st
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime, date, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
-import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 
-# Try to import investpy
-try:
-    import investpy
-    INVESTPY_AVAILABLE = True
-except ImportError:
-    INVESTPY_AVAILABLE = False
+from .history_store import get_history_store, history_key, sync_history
+from .providers import MarketDataProvider, get_provider
+from .calendars import TradingCalendar, calendar_for
+from .panel import PERFORMANCE_PERIODS, ROLLING_ADTV_WINDOWS, PricePanel
+from .quality import count_date_issues, quality_flags
+from .singleflight import SingleFlight
+from .cache import TTLCache
+from .resilience import get_source
+from .fx import get_daily_fx_series_many, get_live_fx_rates
+from .fx_matrix import FXMatrix
+from .schemas import CURRENCY_SYMBOLS
 
 
 @dataclass
@@ -39,6 +45,10 @@ class IndexData:
 
 # Index configurations for Investing.com via investpy
 # Format: investpy uses index name and country
+# timezone / market_close (local HH:MM) / trading_days (numpy weekmask)
+# describe each exchange's regular session for scheduling; holidays are
+# fixed-date closures ("MM-DD" every year, or one-off "YYYY-MM-DD") used to
+# build its trading calendar (see get_trading_calendar)
 INDEX_CONFIGS = {
     "DFM": {
         "investpy_name": "DFM General",
@@ -48,6 +58,10 @@ INDEX_CONFIGS = {
         "exchange_display": "DFM (Dubai)",
         "local_currency": "AED",
         "estimated_market_cap_usd": 244_000_000_000,
+        "timezone": "Asia/Dubai",
+        "market_close": "15:00",
+        "trading_days": "Mon Tue Wed Thu Fri",
+        "holidays": ["01-01", "12-02", "12-03"],
     },
     "ADX": {
         "investpy_name": "ADX General",
@@ -57,6 +71,10 @@ INDEX_CONFIGS = {
         "exchange_display": "ADX (Abu Dhabi)",
         "local_currency": "AED",
         "estimated_market_cap_usd": 844_000_000_000,
+        "timezone": "Asia/Dubai",
+        "market_close": "15:00",
+        "trading_days": "Mon Tue Wed Thu Fri",
+        "holidays": ["01-01", "12-02", "12-03"],
     },
     "TASI": {
         "investpy_name": "Tadawul All Share",
@@ -66,6 +84,10 @@ INDEX_CONFIGS = {
         "exchange_display": "Tadawul (Saudi)",
         "local_currency": "SAR",
         "estimated_market_cap_usd": 2_700_000_000_000,
+        "timezone": "Asia/Riyadh",
+        "market_close": "15:00",
+        "trading_days": "Sun Mon Tue Wed Thu",
+        "holidays": ["02-22", "09-23"],
     },
     "S&P500": {
         "investpy_name": "S&P 500",
@@ -75,6 +97,10 @@ INDEX_CONFIGS = {
         "exchange_display": "NYSE",
         "local_currency": "USD",
         "estimated_market_cap_usd": 50_000_000_000_000,
+        "timezone": "America/New_York",
+        "market_close": "16:00",
+        "trading_days": "Mon Tue Wed Thu Fri",
+        "holidays": ["01-01", "06-19", "07-04", "12-25"],
     },
     "NASDAQ": {
         "investpy_name": "Nasdaq",
@@ -84,6 +110,10 @@ INDEX_CONFIGS = {
         "exchange_display": "NASDAQ",
         "local_currency": "USD",
         "estimated_market_cap_usd": 28_000_000_000_000,
+        "timezone": "America/New_York",
+        "market_close": "16:00",
+        "trading_days": "Mon Tue Wed Thu Fri",
+        "holidays": ["01-01", "06-19", "07-04", "12-25"],
     },
     "FTSE100": {
         "investpy_name": "FTSE 100",
@@ -93,6 +123,10 @@ INDEX_CONFIGS = {
         "exchange_display": "LSE (UK)",
         "local_currency": "GBP",
         "estimated_market_cap_usd": 3_300_000_000_000,
+        "timezone": "Europe/London",
+        "market_close": "16:30",
+        "trading_days": "Mon Tue Wed Thu Fri",
+        "holidays": ["01-01", "12-25", "12-26"],
     },
     "DAX": {
         "investpy_name": "DAX",
@@ -102,6 +136,10 @@ INDEX_CONFIGS = {
         "exchange_display": "XETRA (Germany)",
         "local_currency": "EUR",
         "estimated_market_cap_usd": 2_270_000_000_000,
+        "timezone": "Europe/Berlin",
+        "market_close": "17:30",
+        "trading_days": "Mon Tue Wed Thu Fri",
+        "holidays": ["01-01", "05-01", "12-24", "12-25", "12-26", "12-31"],
     },
     "CAC40": {
         "investpy_name": "CAC 40",
@@ -111,6 +149,10 @@ INDEX_CONFIGS = {
         "exchange_display": "Euronext (France)",
         "local_currency": "EUR",
         "estimated_market_cap_usd": 2_160_000_000_000,
+        "timezone": "Europe/Paris",
+        "market_close": "17:30",
+        "trading_days": "Mon Tue Wed Thu Fri",
+        "holidays": ["01-01", "05-01", "12-25", "12-26"],
     },
     "NIKKEI": {
         "investpy_name": "Nikkei 225",
@@ -120,6 +162,10 @@ INDEX_CONFIGS = {
         "exchange_display": "TSE (Japan)",
         "local_currency": "JPY",
         "estimated_market_cap_usd": 6_330_000_000_000,
+        "timezone": "Asia/Tokyo",
+        "market_close": "15:30",
+        "trading_days": "Mon Tue Wed Thu Fri",
+        "holidays": ["01-01", "01-02", "01-03", "02-11", "02-23", "04-29", "05-03", "05-04", "05-05", "11-03", "11-23", "12-31"],
     },
     "HANGSENG": {
         "investpy_name": "Hang Seng",
@@ -129,6 +175,10 @@ INDEX_CONFIGS = {
         "exchange_display": "HKEX (Hong Kong)",
         "local_currency": "HKD",
         "estimated_market_cap_usd": 5_130_000_000_000,
+        "timezone": "Asia/Hong_Kong",
+        "market_close": "16:00",
+        "trading_days": "Mon Tue Wed Thu Fri",
+        "holidays": ["01-01", "05-01", "07-01", "10-01", "12-25", "12-26"],
     },
 }
 
@@ -142,149 +192,618 @@ FX_RATES_TO_USD = {
     "HKD": 0.128,
 }
 
+# Cross rates for report output currencies (static rates as the base)
+STATIC_FX_MATRIX = FXMatrix.from_rates(FX_RATES_TO_USD)
 
-def calculate_ytd_investpy(index_name: str, country: str, year: int) -> Tuple[Optional[Dict], str]:
+# Upper bound on concurrent index fetches
+MAX_FETCH_WORKERS = 4
+
+# Number of calendar years (including the current one) offered for analysis
+HISTORY_YEARS = 5
+
+# Years of history always synced, so trailing 1M-3Y returns are available
+PERFORMANCE_LOOKBACK_YEARS = 3
+
+# Downloads spanning more days than this are backfills or first syncs:
+# they get the source's full timeout, not one learned from small deltas
+DELTA_MAX_DAYS = 31
+
+# Concurrent sessions syncing the same index share one upstream request
+_index_flights = SingleFlight()
+
+# Shared per-index history cache: fresh for the TTL, then served stale
+# while a background refresh runs, bounded by total DataFrame memory
+INDEX_CACHE_TTL_SECONDS = 15 * 60
+INDEX_CACHE_STALE_SECONDS = 24 * 60 * 60
+INDEX_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _history_weight(synced: Tuple[Optional[pd.DataFrame], str]) -> float:
+    history = synced[0]
+    return float(history.memory_usage(index=True).sum()) if history is not None else 0.0
+
+
+_index_cache = TTLCache(
+    ttl=INDEX_CACHE_TTL_SECONDS,
+    stale_ttl=INDEX_CACHE_STALE_SECONDS,
+    max_weight=INDEX_CACHE_MAX_BYTES,
+    weigher=_history_weight,
+)
+
+
+def configure_index_cache(
+    ttl_seconds: float = INDEX_CACHE_TTL_SECONDS,
+    stale_seconds: float = INDEX_CACHE_STALE_SECONDS,
+    max_bytes: float = INDEX_CACHE_MAX_BYTES,
+):
+    """Replace the shared index cache with new TTL and memory settings."""
+    global _index_cache
+    _index_cache = TTLCache(
+        ttl=ttl_seconds,
+        stale_ttl=stale_seconds,
+        max_weight=max_bytes,
+        weigher=_history_weight,
+    )
+
+
+def get_trading_calendar(index_key: str) -> TradingCalendar:
+    """Trading calendar (sorted session dates) of a configured index's exchange."""
+    return calendar_for(INDEX_CONFIGS[index_key])
+
+
+def compute_yearly_stats(
+    df: pd.DataFrame,
+    years: List[int],
+    calendar: TradingCalendar = None,
+    fx_to_usd: Optional[pd.Series] = None,
+) -> Dict[int, Dict]:
+    """
+    Derive per-calendar-year performance from a daily OHLCV series.
+    For the current year the period runs to the latest row.
+    
+    Args:
+        df: Daily history indexed by date with 'Close' (and optionally 'Volume')
+        years: Years to report
+        calendar: Trading calendar of the index, for the missing-session check
+        fx_to_usd: Daily rate of the index currency to USD; when given,
+            `adtv_usd_daily` converts each day's traded value at that day's rate
+    
+    Returns:
+        Dict of year -> stats dict; years without data are omitted
+    """
+    if df.empty:
+        return {}
+    
+    calendars = {"_": calendar} if calendar else None
+    fx = {"_": fx_to_usd} if fx_to_usd is not None else None
+    by_year = PricePanel.from_histories({"_": df}, fx).year_stats(years, calendars=calendars)
+    return {year: stats["_"] for year, stats in by_year.items() if "_" in stats}
+
+
+def _describe_fetch_error(error: Exception, index_name: str, country: str) -> str:
+    """Turn a provider exception into a user-facing message."""
+    error_msg = str(error)
+    # Check for common errors
+    if "not found" in error_msg.lower() or "ERR#0045" in error_msg:
+        return f"Index '{index_name}' not found in {country}. Check index name."
+    elif "connection" in error_msg.lower():
+        return "Connection error - check internet connection"
+    else:
+        return f"Error: {error_msg}"
+
+
+def _download_history(
+    provider: MarketDataProvider,
+    index_name: str,
+    country: str,
+    from_date: date,
+    to_date: date,
+) -> pd.DataFrame:
+    """
+    Download one history range through the provider's circuit breaker,
+    bounded by the source's adaptive timeout (learned from deltas; ranges
+    longer than DELTA_MAX_DAYS run as "backfill" calls). While the breaker
+    is open this fails fast and the stored history is used.
+    """
+    source = get_source(provider.host or provider.name)
+    kind = "backfill" if (to_date - from_date).days > DELTA_MAX_DAYS else "default"
+    return source.call(
+        lambda timeout: provider.get_index_history(index_name, country, from_date, to_date, timeout=timeout),
+        kind,
+    )
+
+
+def _history_start_year(years: List[int]) -> int:
+    """First calendar year to sync for a set of requested years."""
+    return min(min(years), datetime.now().year - PERFORMANCE_LOOKBACK_YEARS)
+
+
+def _sync_index_history(
+    index_name: str,
+    country: str,
+    years: List[int],
+    provider: MarketDataProvider,
+) -> Tuple[Optional[pd.DataFrame], str]:
     """
-    Calculate YTD performance using investpy (Investing.com data).
+    Sync the stored history of one index from 01/01 of the earliest year
+    (or of the performance lookback, if earlier) to today.
+    Results are served from the shared TTL cache when possible; otherwise
+    concurrent callers for the same (index, start year, provider) wait on a
+    single in-flight sync and share its result.
     """
-    if not INVESTPY_AVAILABLE:
-        return None, "investpy library not installed. Run: pip install investpy"
+    key = (provider.name, country, index_name, _history_start_year(years))
+    return _index_cache.get_or_load(
+        key,
+        lambda: _index_flights.do(key, lambda: _sync_index_history_once(index_name, country, years, provider)),
+        # A failed refresh is not cached, so the next read retries upstream
+        should_cache=lambda synced: synced[0] is not None and not synced[0].attrs.get("refresh_error"),
+    )
+
+
+def _sync_index_history_once(
+    index_name: str,
+    country: str,
+    years: List[int],
+    provider: MarketDataProvider,
+) -> Tuple[Optional[pd.DataFrame], str]:
+    """Run one history sync for an index (see _sync_index_history)."""
+    if not provider.is_available():
+        return None, provider.unavailable_message
     
     try:
         # Get date range
-        start_date = f"01/01/{year}"
-        end_date = datetime.now().strftime("%d/%m/%Y")
+        start_date = date(_history_start_year(years), 1, 1)
+        end_date = datetime.now().date()
         
-        # Fetch historical data from Investing.com
-        df = investpy.get_index_historical_data(
-            index=index_name,
-            country=country,
-            from_date=start_date,
-            to_date=end_date
-        )
+        # Duplicated / unordered dates are only visible before merging
+        date_issues = {"duplicate_dates": 0, "unordered_dates": 0}
         
-        if df.empty:
-            return None, f"No data returned for {index_name}"
+        def download(from_date: date, to_date: date) -> pd.DataFrame:
+            df = _download_history(provider, index_name, country, from_date, to_date)
+            for issue, count in count_date_issues(df.index).items():
+                date_issues[issue] += count
+            return df
         
-        # Get year start and current prices
-        year_start_price = df['Close'].iloc[0]
-        current_price = df['Close'].iloc[-1]
+        history, store_status = sync_history(
+            get_history_store(provider.name),
+            history_key(index_name, country),
+            download,
+            start_date,
+            end_date,
+        )
+        if history.empty:
+            return None, f"No data returned for {index_name}"
         
-        # Calculate YTD percentage
-        ytd_percent = ((current_price - year_start_price) / year_start_price) * 100
+        # Record when the stored history was last refreshed successfully, so
+        # cached results (and stored fallbacks) stay truthful
+        history.attrs["fetched_at"] = history.attrs.get("updated_at") or datetime.now().isoformat()
+        history.attrs["date_issues"] = date_issues
+        return history, store_status
         
-        # Calculate average volume if available
-        avg_volume = None
-        if 'Volume' in df.columns:
-            volumes = df['Volume'].dropna()
-            if len(volumes) > 0 and volumes.sum() > 0:
-                avg_volume = volumes.mean()
+    except Exception as e:
+        return None, _describe_fetch_error(e, index_name, country)
+
+
+def refresh_index_history(
+    index_key: str,
+    years: List[int] = None,
+    provider: MarketDataProvider = None,
+) -> str:
+    """
+    Force a history sync for one configured index, bypassing fresh cache
+    entries, and store the result in the shared cache and history store.
+    Used by the pre-warming scheduler.
+    
+    Returns:
+        Status message from the sync
+    """
+    provider = provider or get_provider()
+    if years is None:
+        current_year = datetime.now().year
+        years = list(range(current_year, current_year - HISTORY_YEARS, -1))
+    
+    config = INDEX_CONFIGS[index_key]
+    index_name, country = config["investpy_name"], config["country"]
+    key = (provider.name, country, index_name, _history_start_year(years))
+    synced = _index_flights.do(key, lambda: _sync_index_history_once(index_name, country, years, provider))
+    if synced[0] is not None and not synced[0].attrs.get("refresh_error"):
+        _index_cache.put(key, synced)
+    return synced[1]
+
+
+def calculate_multi_year_investpy(
+    index_name: str,
+    country: str,
+    years: List[int],
+    provider: MarketDataProvider = None,
+) -> Tuple[Dict[int, Dict], str]:
+    """
+    Calculate performance for several years from a single history pull.
+    The local store is synced once from 01/01 of the earliest year to today;
+    every year is then derived from the merged series without further requests.
+    """
+    provider = provider or get_provider()
+    history, msg = _sync_index_history(index_name, country, years, provider)
+    if history is None:
+        return {}, msg
+    
+    calendar = next(
+        (calendar_for(c) for c in INDEX_CONFIGS.values()
+         if c["investpy_name"] == index_name and c["country"] == country),
+        None,
+    )
+    stats = compute_yearly_stats(history, years, calendar)
+    if not stats:
+        return {}, f"No data returned for {index_name}"
+    
+    return stats, msg
+
+
+def calculate_ytd_investpy(
+    index_name: str,
+    country: str,
+    year: int,
+    provider: MarketDataProvider = None,
+) -> Tuple[Optional[Dict], str]:
+    """
+    Calculate YTD performance using investpy (Investing.com data) or the
+    configured provider. History is kept in the local store; only rows after
+    the last stored date are requested upstream.
+    """
+    stats, msg = calculate_multi_year_investpy(index_name, country, [year], provider)
+    if year not in stats:
+        return None, msg
+    return stats[year], msg
+
+
+def _build_index_result(
+    index_key: str,
+    data: Optional[Dict],
+    msg: str,
+    source_label: str,
+    last_updated: str = None,
+    date_issues: Dict[str, int] = None,
+    refresh_error: str = None,
+) -> Dict:
+    """Build the per-index result dict from a calculation outcome."""
+    config = INDEX_CONFIGS[index_key]
+    
+    if data:
+        quality = {**data.get("quality", {}), **(date_issues or {})}
         
-        result = {
-            "current_price": float(current_price),
-            "year_start_price": float(year_start_price),
-            "ytd_percent": round(ytd_percent, 2),
-            "avg_volume": avg_volume,
-            "data_points": len(df),
-            "start_date": df.index[0].strftime("%Y-%m-%d"),
-            "end_date": df.index[-1].strftime("%Y-%m-%d"),
+        # ADTV is the mean of each day's volume x that day's close (local
+        # currency); only available when the source reports volume. adtv_usd
+        # converts it at one spot rate, adtv_usd_daily each day at its own rate
+        fx_rate = FX_RATES_TO_USD.get(config["local_currency"], 1.0)
+        adtv_usd = data["adtv"] * fx_rate if data.get("adtv") is not None else None
+        rolling_adtv_usd = {
+            f"adtv_{window}d_usd": data[f"adtv_{window}d"] * fx_rate if data.get(f"adtv_{window}d") is not None else None
+            for window in ROLLING_ADTV_WINDOWS
         }
         
-        return result, "Success"
-        
-    except Exception as e:
-        error_msg = str(e)
-        # Check for common errors
-        if "not found" in error_msg.lower() or "ERR#0045" in error_msg:
-            return None, f"Index '{index_name}' not found in {country}. Check index name."
-        elif "connection" in error_msg.lower():
-            return None, "Connection error - check internet connection"
+        return {
+            "key": index_key,
+            "region": config["region"],
+            "exchange": config["exchange_display"],
+            "index_name": config["name"],
+            "local_currency": config["local_currency"],
+            "ytd_percent": data["ytd_percent"],
+            "year_start_price": data["year_start_price"],
+            "current_price": data["current_price"],
+            "market_cap_usd": config.get("estimated_market_cap_usd"),
+            "adtv_usd": adtv_usd,
+            "adtv_usd_daily": data.get("adtv_usd_daily"),
+            **rolling_adtv_usd,
+            **{f"return_{label}": data.get(f"return_{label}") for label in PERFORMANCE_PERIODS},
+            "volatility_1y": data.get("volatility_1y"),
+            "avg_volume": data.get("avg_volume"),
+            "last_updated": last_updated or datetime.now().isoformat(),
+            "data_source": source_label,
+            "data_range": f"{data.get('start_date', 'N/A')} to {data.get('end_date', 'N/A')}",
+            "quality": quality,
+            "quality_flags": quality_flags(quality) + (
+                [f"Stored history as of {last_updated}; refresh failed: {refresh_error}"] if refresh_error else []
+            ),
+            "fetch_status": "success",
+        }
+    
+    return {
+        "key": index_key,
+        "region": config["region"],
+        "exchange": config["exchange_display"],
+        "index_name": config["name"],
+        "local_currency": config["local_currency"],
+        "ytd_percent": None,
+        "market_cap_usd": config.get("estimated_market_cap_usd"),
+        "adtv_usd": None,
+        "adtv_usd_daily": None,
+        "last_updated": datetime.now().isoformat(),
+        "data_source": "Fetch failed",
+        "fetch_status": "failed",
+        "error_message": msg,
+    }
+
+
+def _build_year_results(
+    index_key: str,
+    years: List[int],
+    stats: Dict[int, Dict],
+    msg: str,
+    provider: MarketDataProvider,
+    history: Optional[pd.DataFrame] = None,
+) -> Dict[int, Dict]:
+    """Build one index's result dict for every requested year."""
+    config = INDEX_CONFIGS[index_key]
+    source_label = provider.source_label(config["investpy_name"])
+    last_updated = history.attrs.get("fetched_at") if history is not None else None
+    date_issues = history.attrs.get("date_issues") if history is not None else None
+    refresh_error = history.attrs.get("refresh_error") if history is not None else None
+    
+    results = {}
+    for year in years:
+        if year in stats:
+            results[year] = _build_index_result(
+                index_key, stats[year], msg, source_label, last_updated, date_issues, refresh_error
+            )
         else:
-            return None, f"Error: {error_msg}"
+            error = msg if not stats else f"No data returned for {config['investpy_name']} in {year}"
+            results[year] = _build_index_result(index_key, None, error, source_label)
+    return results
+
+
+def _sync_index(index_key: str, years: List[int], provider: MarketDataProvider) -> Tuple[str, Optional[pd.DataFrame], str]:
+    """Sync one configured index's history; returns (key, history or None, message)."""
+    config = INDEX_CONFIGS[index_key]
+    history, msg = _sync_index_history(config["investpy_name"], config["country"], years, provider)
+    return index_key, history, msg
+
+
+def _resolve_daily_fx(currencies: List[str], start: date, end: date) -> Dict[str, pd.Series]:
+    """Daily rates to USD per currency over [start, end], from one FX store sync."""
+    by_currency, _ = get_daily_fx_series_many(currencies, start, end)
+    return by_currency
 
 
-def fetch_all_indices(selected_indices: List[str] = None, year: int = None) -> Tuple[List[Dict], Dict]:
+def _daily_fx_by_index(
+    histories: Dict[str, pd.DataFrame],
+    by_currency: Dict[str, pd.Series] = None,
+) -> Dict[str, pd.Series]:
     """
-    Fetch data for all selected indices using investpy (Investing.com).
-    FREE and NO rate limits!
+    Daily rates to USD for each index's history (indices without rates are
+    left out). Unless `by_currency` is given, rates are resolved once for
+    all currencies over the span of every history, so the FX store is
+    synced once, not once per index.
     """
-    if not INVESTPY_AVAILABLE:
-        return [], {
-            "success": [], 
-            "failed": [{"index": "ALL", "error": "investpy not installed. Add 'investpy' to requirements.txt"}], 
-            "timestamp": datetime.now().isoformat()
-        }
+    spans = {
+        key: (history.index[0].date(), history.index[-1].date())
+        for key, history in histories.items()
+        if history is not None and not history.empty
+    }
+    if not spans:
+        return {}
+    if by_currency is None:
+        by_currency = _resolve_daily_fx(
+            [INDEX_CONFIGS[key]["local_currency"] for key in spans],
+            min(start for start, _ in spans.values()),
+            max(end for _, end in spans.values()),
+        )
+    return {
+        key: by_currency[INDEX_CONFIGS[key]["local_currency"]]
+        for key in spans
+        if INDEX_CONFIGS[key]["local_currency"] in by_currency
+    }
+
+
+def _fetch_index_years(
+    index_key: str,
+    years: List[int],
+    provider: MarketDataProvider,
+    daily_fx: Future = None,
+) -> Dict[int, Dict]:
+    """
+    Fetch one configured index once and build its result for every year.
+    `daily_fx` is a future of the shared currency -> daily rates lookup
+    (resolved for this index alone if missing).
+    """
+    _, history, msg = _sync_index(index_key, years, provider)
+    calendar = get_trading_calendar(index_key)
+    if history is not None:
+        by_currency = daily_fx.result() if daily_fx is not None else None
+        fx_to_usd = _daily_fx_by_index({index_key: history}, by_currency).get(index_key)
+        stats = compute_yearly_stats(history, years, calendar, fx_to_usd)
+    else:
+        stats = {}
+    return _build_year_results(index_key, years, stats, msg, provider, history)
+
+
+def _iter_index_years(
+    selected_indices: List[str],
+    years: List[int],
+    max_workers: int,
+    provider: MarketDataProvider,
+) -> Iterator[Dict[int, Dict]]:
+    """
+    Stream _fetch_index_years for the selected indices. Daily FX for all
+    their currencies is synced once, alongside the history downloads, so a
+    row never waits on more than that one FX sync.
+
+    Each row is computed from a one-index PricePanel as soon as its history
+    arrives; this deliberately bypasses the shared date x index panel of
+    fetch_all_years, which needs every history before computing anything.
+    """
+    known = [key for key in dict.fromkeys(selected_indices) if key in INDEX_CONFIGS]
+    if not known:
+        return
+    fx_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="daily-fx")
+    try:
+        daily_fx = fx_pool.submit(
+            _resolve_daily_fx,
+            [INDEX_CONFIGS[key]["local_currency"] for key in known],
+            date(_history_start_year(years), 1, 1),
+            datetime.now().date(),
+        )
+        yield from _iter_pool(_fetch_index_years, known, max_workers, years, provider, daily_fx)
+    finally:
+        fx_pool.shutdown(wait=False)
+
+
+def _iter_pool(fn, selected_indices: List[str], max_workers: int, *args) -> Iterator:
+    """Run fn(index_key, *args) for each known index, yielding in completion order."""
+    known = [key for key in dict.fromkeys(selected_indices) if key in INDEX_CONFIGS]
+    if not known:
+        return
     
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(known))))
+    try:
+        futures = [pool.submit(fn, key, *args) for key in known]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # Stop queued fetches if the consumer abandons the generator early
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_fetch_indices(
+    selected_indices: List[str] = None,
+    year: int = None,
+    max_workers: int = MAX_FETCH_WORKERS,
+    provider: MarketDataProvider = None,
+) -> Iterator[Dict]:
+    """
+    Fetch selected indices concurrently, yielding each index's result dict
+    as soon as it completes (completion order, not selection order).
+    Unknown index keys are skipped; see build_fetch_status.
+    """
     if selected_indices is None:
         selected_indices = list(INDEX_CONFIGS.keys())
     
     if year is None:
         year = datetime.now().year
     
-    results = []
-    status = {"success": [], "failed": [], "timestamp": datetime.now().isoformat()}
+    provider = provider or get_provider()
+    for by_year in _iter_index_years(selected_indices, [year], max_workers, provider):
+        yield by_year[year]
+
+
+def iter_fetch_indices_multi_year(
+    selected_indices: List[str] = None,
+    years: List[int] = None,
+    max_workers: int = MAX_FETCH_WORKERS,
+    provider: MarketDataProvider = None,
+) -> Iterator[Dict[int, Dict]]:
+    """
+    Like iter_fetch_indices, but each index's history is pulled once for the
+    whole window and every year is derived from it. Yields {year: result}.
+    """
+    if selected_indices is None:
+        selected_indices = list(INDEX_CONFIGS.keys())
+    
+    if years is None:
+        current_year = datetime.now().year
+        years = list(range(current_year, current_year - HISTORY_YEARS, -1))
+    
+    provider = provider or get_provider()
+    yield from _iter_index_years(selected_indices, list(years), max_workers, provider)
+
+
+def build_fetch_status(selected_indices: List[str], results: List[Dict], timestamp: str = None) -> Dict:
+    """Build the fetch status dict for results, in selection order."""
+    status = {"success": [], "failed": [], "timestamp": timestamp or datetime.now().isoformat()}
+    by_key = {r["key"]: r for r in results}
     
     for index_key in selected_indices:
         if index_key not in INDEX_CONFIGS:
             status["failed"].append({"index": index_key, "error": "Unknown index"})
             continue
         
-        config = INDEX_CONFIGS[index_key]
-        investpy_name = config["investpy_name"]
-        country = config["country"]
-        
-        # Small delay to be polite to Investing.com servers
-        time.sleep(0.3)
-        
-        data, msg = calculate_ytd_investpy(investpy_name, country, year)
-        
-        if data:
-            # Calculate ADTV in USD if volume data available
-            adtv_usd = None
-            if data.get("avg_volume") and data["avg_volume"] > 0:
-                avg_price = data["current_price"]
-                adtv_local = data["avg_volume"] * avg_price
-                fx_rate = FX_RATES_TO_USD.get(config["local_currency"], 1.0)
-                adtv_usd = adtv_local * fx_rate
-            
-            result = {
-                "key": index_key,
-                "region": config["region"],
-                "exchange": config["exchange_display"],
-                "index_name": config["name"],
-                "local_currency": config["local_currency"],
-                "ytd_percent": data["ytd_percent"],
-                "year_start_price": data["year_start_price"],
-                "current_price": data["current_price"],
-                "market_cap_usd": config.get("estimated_market_cap_usd"),
-                "adtv_usd": adtv_usd,
-                "avg_volume": data.get("avg_volume"),
-                "last_updated": datetime.now().isoformat(),
-                "data_source": f"Investing.com ({investpy_name})",
-                "data_range": f"{data.get('start_date', 'N/A')} to {data.get('end_date', 'N/A')}",
-                "fetch_status": "success",
-            }
-            results.append(result)
+        result = by_key.get(index_key)
+        if result is None:
+            continue
+        if result["fetch_status"] == "success":
             status["success"].append(index_key)
         else:
-            result = {
-                "key": index_key,
-                "region": config["region"],
-                "exchange": config["exchange_display"],
-                "index_name": config["name"],
-                "local_currency": config["local_currency"],
-                "ytd_percent": None,
-                "market_cap_usd": config.get("estimated_market_cap_usd"),
-                "adtv_usd": None,
-                "last_updated": datetime.now().isoformat(),
-                "data_source": "Fetch failed",
-                "fetch_status": "failed",
-                "error_message": msg,
-            }
-            results.append(result)
-            status["failed"].append({"index": index_key, "error": msg})
-    
-    return results, status
+            status["failed"].append({"index": index_key, "error": result["error_message"]})
+    
+    return status
+
+
+def fetch_all_indices(
+    selected_indices: List[str] = None,
+    year: int = None,
+    max_workers: int = MAX_FETCH_WORKERS,
+    provider: MarketDataProvider = None,
+) -> Tuple[List[Dict], Dict]:
+    """
+    Fetch data for all selected indices using investpy (Investing.com) or
+    the configured provider.
+    Indices are fetched concurrently by a bounded worker pool; requests to
+    each upstream host are paced by a shared token-bucket rate limiter.
+    Results are returned in the order the indices were selected.
+    """
+    provider = provider or get_provider()
+    if not provider.is_available():
+        return [], {
+            "success": [], 
+            "failed": [{"index": "ALL", "error": provider.unavailable_message}], 
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    if selected_indices is None:
+        selected_indices = list(INDEX_CONFIGS.keys())
+    
+    if year is None:
+        year = datetime.now().year
+    
+    return fetch_all_years(selected_indices, [year], max_workers, provider)[year]
+
+
+def fetch_all_years(
+    selected_indices: List[str] = None,
+    years: List[int] = None,
+    max_workers: int = MAX_FETCH_WORKERS,
+    provider: MarketDataProvider = None,
+) -> Dict[int, Tuple[List[Dict], Dict]]:
+    """
+    Fetch every selected index once and derive results for all years.
+    Histories are synced concurrently, then every index and year is computed
+    in one vectorized panel pass (see src/panel.py).
+    Returns a dict of year -> (results, status), each as fetch_all_indices.
+    """
+    if selected_indices is None:
+        selected_indices = list(INDEX_CONFIGS.keys())
+    
+    if years is None:
+        current_year = datetime.now().year
+        years = list(range(current_year, current_year - HISTORY_YEARS, -1))
+    
+    timestamp = datetime.now().isoformat()
+    provider = provider or get_provider()
+    
+    # Network phase: sync every history concurrently
+    synced = {
+        key: (history, msg)
+        for key, history, msg in _iter_pool(_sync_index, selected_indices, max_workers, list(years), provider)
+    }
+    
+    # Compute phase: one panel pass over all indices and years, with daily
+    # FX resolved once per currency after every history is in
+    histories = {key: history for key, (history, _) in synced.items() if history is not None}
+    panel = PricePanel.from_histories(histories, _daily_fx_by_index(histories))
+    panel_stats = panel.year_stats(
+        years, calendars={key: get_trading_calendar(key) for key in panel.keys}
+    )
+    
+    fetched = {}
+    for key, (history, msg) in synced.items():
+        stats = {year: panel_stats[year][key] for year in years if key in panel_stats[year]}
+        fetched[key] = _build_year_results(key, years, stats, msg, provider, history)
+    
+    by_year_results = {}
+    for year in years:
+        results = [fetched[key][year] for key in selected_indices if key in fetched]
+        by_year_results[year] = (results, build_fetch_status(selected_indices, results, timestamp))
+    
+    return by_year_results
 
 
 def get_available_indices() -> List[Dict]:
@@ -301,27 +820,61 @@ def get_available_indices() -> List[Dict]:
     ]
 
 
-def create_comparison_df(results: List[Dict]) -> pd.DataFrame:
-    """Create a formatted DataFrame from fetch results."""
+def get_report_fx_matrix(output_currency: str = "USD") -> Tuple[FXMatrix, str]:
+    """
+    Cross-rate matrix for converting USD results to a report currency.
+
+    The static rates are overlaid with the output currency's live rate to
+    USD (pegs and cached rates need no request); they are used unchanged
+    if the live lookup fails.
+
+    Returns:
+        Tuple of (FXMatrix on a USD base, status message)
+    """
+    if output_currency == "USD":
+        return STATIC_FX_MATRIX, "USD output, no conversion needed"
+    live, status = get_live_fx_rates([output_currency], "USD")
+    if output_currency not in live:
+        if output_currency in STATIC_FX_MATRIX:
+            return STATIC_FX_MATRIX, f"Using static {output_currency} rate ({status})"
+        return STATIC_FX_MATRIX, f"No {output_currency} rate available ({status})"
+    matrix = FXMatrix.from_rates({**FX_RATES_TO_USD, output_currency: live[output_currency].rate})
+    return matrix, f"1 {output_currency} = {live[output_currency].rate:.6f} USD ({live[output_currency].source})"
+
+
+def create_comparison_df(
+    results: List[Dict],
+    output_currency: str = "USD",
+    fx_matrix: FXMatrix = None,
+) -> pd.DataFrame:
+    """
+    Create a formatted DataFrame from fetch results.
+
+    Market cap and ADTV, spot- and daily-converted (USD in the results),
+    are converted to `output_currency` in one broadcast through the
+    cross-rate matrix (STATIC_FX_MATRIX if none is given).
+    """
+    symbol = CURRENCY_SYMBOLS.get(output_currency, f"{output_currency} ")
+    
     def format_market_cap(val):
         if val is None:
             return "N/A"
         if val >= 1e12:
-            return f"${val/1e12:.2f}T"
+            return f"{symbol}{val/1e12:.2f}T"
         elif val >= 1e9:
-            return f"${val/1e9:.1f}B"
+            return f"{symbol}{val/1e9:.1f}B"
         else:
-            return f"${val/1e6:.0f}M"
+            return f"{symbol}{val/1e6:.0f}M"
     
     def format_adtv(val):
         if val is None:
             return "N/A"
         if val >= 1e9:
-            return f"${val/1e9:.1f}B"
+            return f"{symbol}{val/1e9:.1f}B"
         elif val >= 1e6:
-            return f"${val/1e6:.0f}M"
+            return f"{symbol}{val/1e6:.0f}M"
         else:
-            return f"${val/1e3:.0f}K"
+            return f"{symbol}{val/1e3:.0f}K"
     
     def format_ytd(val):
         if val is None:
@@ -329,19 +882,45 @@ def create_comparison_df(results: List[Dict]) -> pd.DataFrame:
         sign = "+" if val >= 0 else ""
         return f"{sign}{val:.2f}%"
     
+    def format_volatility(val):
+        if val is None:
+            return "N/A"
+        return f"{val:.1f}%"
+    
+    # Columns: market cap, ADTV at spot FX, ADTV at daily FX (NaN where missing)
+    usd_values = np.array(
+        [[r.get("market_cap_usd"), r.get("adtv_usd"), r.get("adtv_usd_daily")] for r in results], dtype=float
+    ).reshape(-1, 3)
+    if output_currency == "USD":
+        values = usd_values
+    else:
+        values = (fx_matrix or STATIC_FX_MATRIX).convert(usd_values, "USD", output_currency)
+    values = [[None if np.isnan(v) else float(v) for v in row] for row in values]
+    
     data = []
-    for r in results:
-        data.append({
+    for r, (market_cap, adtv, adtv_daily) in zip(results, values):
+        row = {
             "Region": r["region"],
             "Exchange": r["exchange"],
             "Index Name": r["index_name"],
             "YTD % Change": format_ytd(r.get("ytd_percent")),
-            "Market Cap (USD)": format_market_cap(r.get("market_cap_usd")),
-            "Avg Daily Value (USD)": format_adtv(r.get("adtv_usd")),
+        }
+        for label in PERFORMANCE_PERIODS:
+            row[f"{label.upper()} %"] = format_ytd(r.get(f"return_{label}"))
+        row.update({
+            "Volatility (1Y, ann.)": format_volatility(r.get("volatility_1y")),
+            f"Market Cap ({output_currency})": format_market_cap(market_cap),
+            f"Avg Daily Value ({output_currency})": format_adtv(adtv),
+            f"Avg Daily Value, daily FX ({output_currency})": format_adtv(adtv_daily),
             "_ytd_raw": r.get("ytd_percent"),
-            "_cap_raw": r.get("market_cap_usd"),
-            "_adtv_raw": r.get("adtv_usd"),
+            "_cap_raw": market_cap,
+            "_adtv_raw": adtv,
+            "_adtv_daily_raw": adtv_daily,
         })
+        for label in PERFORMANCE_PERIODS:
+            row[f"_{label}_raw"] = r.get(f"return_{label}")
+        row["_volatility_raw"] = r.get("volatility_1y")
+        data.append(row)
     
     return pd.DataFrame(data)
 
@@ -355,19 +934,26 @@ def update_market_caps(results: List[Dict], manual_caps: Dict[str, float]) -> Li
     return results
 
 
-def search_available_indices(country: str = None) -> List[Dict]:
+def get_coalescing_stats() -> Dict[str, int]:
+    """Counts of upstream syncs run vs. shared by concurrent callers."""
+    return _index_flights.stats()
+
+
+def get_cache_stats() -> Dict[str, float]:
+    """Hit/miss/eviction counters of the shared index cache."""
+    return _index_cache.stats()
+
+
+def search_available_indices(country: str = None, provider: MarketDataProvider = None) -> List[Dict]:
     """
-    Search for available indices on Investing.com.
+    Search for available indices on Investing.com (or the configured provider).
     Useful for finding correct index names.
     """
-    if not INVESTPY_AVAILABLE:
+    provider = provider or get_provider()
+    if not provider.is_available():
         return []
     
     try:
-        if country:
-            indices = investpy.get_indices(country=country)
-        else:
-            indices = investpy.get_indices_list(country="united states")
-        return indices.to_dict('records') if hasattr(indices, 'to_dict') else []
+        return provider.search_indices(country)
     except Exception as e:
         return []
@@ -8,8 +8,12 @@ import requests
 from bs4 import BeautifulSoup
 from datetime import datetime
 from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
 import re
 
+from .resilience import CircuitOpenError, get_source
+from .http_client import get_http_client
+
 
 class ExtractionError(Exception):
     """Custom exception for extraction failures."""
@@ -22,7 +26,7 @@ def fetch_page(url: str, timeout: int = 15) -> Tuple[Optional[str], str]:
     
     Args:
         url: URL to fetch
-        timeout: Request timeout in seconds
+        timeout: Maximum request timeout in seconds (adapts to observed latency)
     
     Returns:
         Tuple of (HTML content or None, status message)
@@ -31,9 +35,17 @@ def fetch_page(url: str, timeout: int = 15) -> Tuple[Optional[str], str]:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
-        response = requests.get(url, headers=headers, timeout=timeout)
-        response.raise_for_status()
+        
+        def request(adaptive_timeout: float):
+            budget = min(timeout, adaptive_timeout)
+            response = get_http_client().get(url, headers=headers, timeout=budget, deadline=budget)
+            response.raise_for_status()
+            return response
+        
+        response = get_source(urlparse(url).netloc or url).call(request)
         return response.text, "Success"
+    except CircuitOpenError as e:
+        return None, str(e)
     except requests.exceptions.Timeout:
         return None, f"Timeout fetching {url}"
     except requests.exceptions.RequestException as e:
@@ -3,11 +3,34 @@ FX Rate retrieval and management module.
 Supports live spot rates, manual entry, and average calculation.
 """
 
-import requests
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, date
 from typing import Dict, Optional, Tuple
 import pandas as pd
-from .schemas import Currency, FXMode, FXRate, FXConfiguration
+from .schemas import Currency, FXMode, FXConfiguration, RateRecord
+from .resilience import UpstreamError, get_source
+from .http_client import get_http_client
+from .fx_cache import get_fx_cache, peg_rate
+from .fx_history import FXAverageIndex, get_fx_history_store, sync_fx_history
+from .fx_matrix import FXMatrix
+
+
+# Base URLs of the live FX providers; the environment variables (or
+# set_fx_provider_urls) point them at local stand-ins such as
+# `python -m benchmarks.mock_server`
+EXCHANGERATE_HOST_URL = os.environ.get("FX_EXCHANGERATE_HOST_URL", "https://api.exchangerate.host").rstrip("/")
+FRANKFURTER_URL = os.environ.get("FX_FRANKFURTER_URL", "https://api.frankfurter.app").rstrip("/")
+
+
+def set_fx_provider_urls(exchangerate_host: str = None, frankfurter: str = None):
+    """Replace the base URL of one or both live FX providers."""
+    global EXCHANGERATE_HOST_URL, FRANKFURTER_URL
+    if exchangerate_host:
+        EXCHANGERATE_HOST_URL = exchangerate_host.rstrip("/")
+    if frankfurter:
+        FRANKFURTER_URL = frankfurter.rstrip("/")
 
 
 class FXError(Exception):
@@ -15,101 +38,446 @@ class FXError(Exception):
     pass
 
 
+def _fetch_json(source_name: str, url: str) -> Optional[dict]:
+    """
+    GET a JSON document through the source's circuit breaker.
+    The call's total deadline (retries included) adapts to the source's
+    observed latency; server errors count as failures. Raises
+    CircuitOpenError while the breaker is open.
+    """
+    def request(timeout: float):
+        response = get_http_client().get(url, timeout=timeout, deadline=timeout)
+        if response.status_code >= 500:
+            raise UpstreamError(f"HTTP {response.status_code} from {source_name}")
+        return response
+    
+    response = get_source(source_name).call(request)
+    return response.json() if response.status_code == 200 else None
+
+
+# Live providers in fallback order: source name -> label recorded on each rate
+FX_PROVIDERS = {
+    "exchangerate.host": "exchangerate.host",
+    "frankfurter.app": "ECB via frankfurter.app",
+}
+
+
+def _fetch_batch(source_name: str, currencies: list[str], quote_currency: str) -> Dict[str, float]:
+    """
+    Fetch rates for many currencies from one provider in a single request.
+
+    The request asks for quote-currency-based rates (1 quote = x currency)
+    for every currency at once; each is inverted to currency->quote.
+
+    Returns:
+        Dict of currency -> rate for the currencies the provider returned
+    """
+    symbols = ",".join(currencies)
+    if source_name == "exchangerate.host":
+        url = f"{EXCHANGERATE_HOST_URL}/latest?base={quote_currency}&symbols={symbols}"
+    else:
+        url = f"{FRANKFURTER_URL}/latest?from={quote_currency}&to={symbols}"
+    
+    data = _fetch_json(source_name, url)
+    if not data or data.get("success") is False:
+        return {}
+    
+    quoted = data.get("rates") or {}
+    return {
+        currency: 1.0 / float(quoted[currency])
+        for currency in currencies
+        if quoted.get(currency)
+    }
+
+
+# Hedged live requests: the fallback is fired once the primary has been
+# silent for its observed p95 latency, clamped to these bounds (seconds)
+FX_HEDGE_MIN_DELAY = 0.2
+FX_HEDGE_MAX_DELAY = 2.0
+FX_HEDGE_DEFAULT_DELAY = 0.5
+
+# Concurrent requests per provider. Each provider has its own pool, so
+# primaries abandoned while they run out their deadline only hold the slow
+# provider's workers and never delay the hedge sent to the other one
+FX_PROVIDER_MAX_IN_FLIGHT = 16
+
+_provider_pools: Dict[str, ThreadPoolExecutor] = {}
+_provider_pools_lock = threading.Lock()
+
+
+def _provider_pool(source_name: str) -> ThreadPoolExecutor:
+    """Worker pool dedicated to requests to one FX provider."""
+    with _provider_pools_lock:
+        pool = _provider_pools.get(source_name)
+        if pool is None:
+            pool = ThreadPoolExecutor(
+                max_workers=FX_PROVIDER_MAX_IN_FLIGHT,
+                thread_name_prefix=f"fx-{source_name}",
+            )
+            _provider_pools[source_name] = pool
+        return pool
+
+
+def _hedge_delay(source_name: str) -> float:
+    """Latency budget before hedging a request to `source_name`."""
+    observed = get_source(source_name).timeout.latency_percentile(95)
+    if observed is None:
+        return FX_HEDGE_DEFAULT_DELAY
+    return min(FX_HEDGE_MAX_DELAY, max(FX_HEDGE_MIN_DELAY, observed))
+
+
+def _fetch_batch_hedged(
+    primary: str,
+    fallback: str,
+    currencies: list[str],
+    quote_currency: str,
+    delay: float,
+) -> Tuple[list, list[str], list[str]]:
+    """
+    Fetch a batch from the primary, hedged with the fallback.
+
+    If the primary has not answered with every currency within `delay`
+    seconds, the fallback is fired in parallel for the missing ones. The
+    first valid answer wins; the other request is cancelled once the
+    winner covers every currency (an attempt already in flight is
+    abandoned and its result discarded).
+
+    Returns:
+        Tuple of (list of (source name, currency->rate) in the order they
+        answered, error messages, names of providers tried)
+    """
+    futures = {_provider_pool(primary).submit(_fetch_batch, primary, currencies, quote_currency): primary}
+    results = []
+    errors = []
+    
+    def collect(done):
+        for future in done:
+            try:
+                fetched = future.result()
+            except Exception as e:
+                errors.append(f"{futures[future]} failed - {str(e)}")
+                continue
+            if fetched:
+                results.append((futures[future], fetched))
+    
+    def missing():
+        covered = {c for _, fetched in results for c in fetched}
+        return [c for c in currencies if c not in covered]
+    
+    outstanding = set(futures)
+    done, outstanding = wait(outstanding, timeout=delay)
+    collect(done)
+    if missing():
+        # Primary slow, failed or partial: fire the fallback in parallel
+        hedge = _provider_pool(fallback).submit(_fetch_batch, fallback, missing(), quote_currency)
+        futures[hedge] = fallback
+        outstanding.add(hedge)
+    
+    while outstanding and missing():
+        done, outstanding = wait(outstanding, return_when=FIRST_COMPLETED)
+        collect(done)
+    for future in outstanding:
+        future.cancel()
+    
+    return results, errors, list(futures.values())
+
+
+def _fetch_timeseries_batch(
+    source_name: str,
+    currencies: list[str],
+    start_date: date,
+    end_date: date,
+    quote_currency: str,
+) -> pd.DataFrame:
+    """
+    Fetch daily rates for many currencies over a date range from one
+    provider in a single time-series request, inverted to currency->quote.
+
+    Returns:
+        DataFrame indexed by date with a column per returned currency (no
+        rows if the provider has no rates at all for the range)
+
+    Raises:
+        FXError: if the provider did not answer with rates (error status
+            or success=false)
+    """
+    symbols = ",".join(currencies)
+    if source_name == "exchangerate.host":
+        url = (
+            f"{EXCHANGERATE_HOST_URL}/timeseries?start_date={start_date}&end_date={end_date}"
+            f"&base={quote_currency}&symbols={symbols}"
+        )
+    else:
+        url = f"{FRANKFURTER_URL}/{start_date}..{end_date}?from={quote_currency}&to={symbols}"
+    
+    data = _fetch_json(source_name, url)
+    if not data or data.get("success") is False:
+        raise FXError(f"no time series from {source_name}")
+    
+    by_day = data.get("rates") or {}
+    df = pd.DataFrame.from_dict(by_day, orient="index", dtype=float)
+    if not by_day:
+        return df
+    df.index = pd.to_datetime(df.index).date
+    df = df[[c for c in currencies if c in df.columns]]
+    return (1.0 / df).sort_index()
+
+
+def fetch_fx_timeseries(
+    currencies: list[str],
+    start_date: date,
+    end_date: date,
+    quote_currency: str = "USD",
+    source: str = "exchangerate.host",
+) -> pd.DataFrame:
+    """
+    Fetch daily FX rates for a date range, one request per provider.
+
+    Currencies the primary provider does not return are requested from the
+    fallback in one further request.
+
+    Args:
+        currencies: Currency codes to fetch
+        start_date: First date of the range
+        end_date: Last date of the range
+        quote_currency: Currency the rates are quoted in (default USD)
+        source: API source to use first
+
+    Returns:
+        DataFrame indexed by date with a rate column per returned currency;
+        empty only if a provider answered that the range has no rates
+
+    Raises:
+        FXError: if no provider returned any of the currencies and none
+            answered with an empty range
+    """
+    providers = [source] if source in FX_PROVIDERS else []
+    providers += [name for name in FX_PROVIDERS if name not in providers]
+    
+    frames = []
+    pending = list(currencies)
+    errors = []
+    answered_empty = False
+    for source_name in providers:
+        if not pending:
+            break
+        try:
+            df = _fetch_timeseries_batch(source_name, pending, start_date, end_date, quote_currency)
+        except Exception as e:
+            errors.append(f"{source_name} failed - {str(e)}")
+            continue
+        if len(df.columns):
+            frames.append(df)
+            pending = [c for c in pending if c not in df.columns]
+        elif not len(df.index):
+            answered_empty = True
+        else:
+            errors.append(f"{source_name} returned no {', '.join(pending)} rates")
+    
+    if not frames:
+        if answered_empty:
+            return pd.DataFrame()
+        raise FXError("; ".join(errors))
+    return pd.concat(frames, axis=1).sort_index()
+
+
+def get_daily_fx_series_many(
+    currencies: list[str],
+    start_date: date,
+    end_date: date,
+    source: str = "exchangerate.host",
+) -> Tuple[Dict[str, pd.Series], str]:
+    """
+    Daily rates of several currencies to USD over one date range.
+
+    USD-pegged currencies get their peg on every weekday without a request;
+    floating ones are read from the local FX history store after a single
+    bulk sync for all of them (see src/fx_history.py).
+
+    Returns:
+        Tuple of (currency -> rates indexed by date, for the currencies
+        available, status message)
+    """
+    series = {}
+    floating = []
+    for currency in dict.fromkeys(currencies):
+        pegged = (1.0, "identity") if currency == "USD" else peg_rate(currency, "USD")
+        if pegged is not None:
+            days = pd.bdate_range(start_date, end_date).date
+            series[currency] = pd.Series(pegged[0], index=days, name=currency)
+        else:
+            floating.append(currency)
+    if not floating:
+        return series, "identity/pegged"
+    
+    try:
+        table, status = sync_fx_history(
+            get_fx_history_store(),
+            lambda pending, start, end: fetch_fx_timeseries(pending, start, end, "USD", source),
+            floating,
+            start_date,
+            end_date,
+        )
+    except Exception as e:
+        return series, f"FX history unavailable: {str(e)}"
+    rates = table.set_index("date")
+    missing = []
+    for currency in floating:
+        column = f"{currency}USD"
+        values = rates[column].dropna() if column in rates.columns else pd.Series(dtype=float)
+        values = values[(values.index >= start_date) & (values.index <= end_date)]
+        if values.empty:
+            missing.append(currency)
+        else:
+            series[currency] = values.rename(currency)
+    if missing:
+        status = f"No daily {', '.join(missing)} rates ({status})"
+    return series, status
+
+
 def get_live_fx_rates(
     base_currencies: list[str],
     quote_currency: str = "USD",
-    source: str = "exchangerate.host"
-) -> Tuple[Dict[str, FXRate], str]:
+    source: str = "exchangerate.host",
+    use_cache: bool = True,
+    hedge: bool = True,
+) -> Tuple[Dict[str, RateRecord], str]:
     """
     Fetch live FX spot rates from a free API.
     
+    USD-pegged pairs resolve from the peg table and fresh cached rates from
+    the FX cache, both without network (see src/fx_cache.py). The rest are
+    requested from the primary provider in one batch; only those it does
+    not return are requested (again in one batch) from the fallback, then
+    static rates cover what is still missing. With `hedge`, the fallback
+    is fired in parallel as soon as the primary exceeds its latency budget
+    instead of after it fails; each rate records the provider that
+    answered.
+    
     Args:
         base_currencies: List of currency codes to get rates for
         quote_currency: Target currency (default USD)
-        source: API source to use
+        source: API source to use first
+        use_cache: Serve pegs and fresh cached rates without network
+        hedge: Race the fallback against a slow primary
     
     Returns:
-        Tuple of (dict of currency->FXRate, status message)
+        Tuple of (dict of currency->RateRecord, status message)
     """
     rates = {}
     errors = []
     timestamp = datetime.utcnow()
+    cache = get_fx_cache()
     
-    # Primary: exchangerate.host (free, no API key required for basic usage)
-    # Fallback: ECB rates via frankfurter.app
-    
-    for currency in base_currencies:
+    # currency -> (rate, source, timestamp the rate was obtained)
+    resolved: Dict[str, Tuple[float, str, datetime]] = {}
+    pending = []
+    for currency in dict.fromkeys(base_currencies):
         if currency == quote_currency:
             # Same currency, rate is 1.0
-            rates[currency] = FXRate(
-                base_currency=Currency(currency),
-                quote_currency=Currency(quote_currency),
-                rate=1.0,
-                source="identity",
-                timestamp=timestamp
-            )
+            resolved[currency] = (1.0, "identity", timestamp)
             continue
-        
-        rate = None
-        used_source = source
-        
-        # Try exchangerate.host first
-        if source == "exchangerate.host":
-            try:
-                # Using exchangerate.host free API
-                url = f"https://api.exchangerate.host/convert?from={currency}&to={quote_currency}"
-                response = requests.get(url, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("success") and data.get("result"):
-                        rate = float(data["result"])
-            except Exception as e:
-                errors.append(f"{currency}: exchangerate.host failed - {str(e)}")
-        
-        # Fallback to frankfurter.app (ECB rates)
-        if rate is None:
-            try:
-                url = f"https://api.frankfurter.app/latest?from={currency}&to={quote_currency}"
-                response = requests.get(url, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if quote_currency in data.get("rates", {}):
-                        rate = float(data["rates"][quote_currency])
-                        used_source = "ECB via frankfurter.app"
-            except Exception as e:
-                errors.append(f"{currency}: frankfurter.app failed - {str(e)}")
-        
-        # Fallback to static rates for GCC currencies (pegged to USD)
-        if rate is None:
-            static_rates = {
-                "AED": 0.2723,  # AED is pegged at 3.6725 AED/USD
-                "SAR": 0.2666,  # SAR is pegged at 3.75 SAR/USD
-                "KWD": 3.25,    # Approximate, managed float
-                "QAR": 0.2747,  # QAR is pegged at 3.64 QAR/USD
-                "HKD": 0.128,   # HKD pegged to USD
-            }
-            if currency in static_rates:
-                rate = static_rates[currency]
-                used_source = "static_pegged_rate"
-                errors.append(f"{currency}: Using static pegged rate (live fetch failed)")
-        
-        if rate is not None:
-            rates[currency] = FXRate(
-                base_currency=Currency(currency) if currency in Currency.__members__ else currency,
-                quote_currency=Currency(quote_currency),
-                rate=rate,
-                source=used_source,
-                timestamp=timestamp
-            )
+        if use_cache:
+            pegged = peg_rate(currency, quote_currency)
+            if pegged is not None:
+                resolved[currency] = (*pegged, timestamp)
+                continue
+            cached = cache.get(currency, quote_currency)
+            if cached is not None:
+                resolved[currency] = (cached["rate"], cached["source"], datetime.fromisoformat(cached["timestamp"]))
+                continue
+        pending.append(currency)
+    
+    def record(source_name: str, fetched: Dict[str, float]):
+        # Earlier answers win; later ones only fill currencies still missing
+        fetched = {c: rate for c, rate in fetched.items() if c in pending}
+        for currency, rate in fetched.items():
+            resolved[currency] = (rate, FX_PROVIDERS[source_name], timestamp)
+        cache.put_many(
+            {currency: (rate, FX_PROVIDERS[source_name]) for currency, rate in fetched.items()},
+            quote_currency,
+            timestamp,
+        )
+        return [c for c in pending if c not in fetched]
+    
+    # Primary first, then the remaining provider(s) for whatever is missing
+    providers = [source] if source in FX_PROVIDERS else []
+    providers += [name for name in FX_PROVIDERS if name not in providers]
+    if hedge and pending and len(providers) > 1:
+        answers, hedge_errors, tried = _fetch_batch_hedged(
+            providers[0], providers[1], pending, quote_currency, _hedge_delay(providers[0])
+        )
+        errors.extend(hedge_errors)
+        for source_name, fetched in answers:
+            pending = record(source_name, fetched)
+        providers = [name for name in providers if name not in tried]
+    for source_name in providers:
+        if not pending:
+            break
+        try:
+            fetched = _fetch_batch(source_name, pending, quote_currency)
+        except Exception as e:
+            errors.append(f"{source_name} failed - {str(e)}")
+            continue
+        pending = record(source_name, fetched)
+    
+    # Fallback to pegs (when the cache was bypassed) and static approximations
+    static_rates = {
+        "KWD": 3.25,    # Approximate, managed float
+    }
+    for currency in pending:
+        pegged = peg_rate(currency, quote_currency)
+        if pegged is not None:
+            resolved[currency] = (*pegged, timestamp)
+            errors.append(f"{currency}: Using USD peg (live fetch failed)")
+        elif quote_currency == "USD" and currency in static_rates:
+            resolved[currency] = (static_rates[currency], "static_approximate_rate", timestamp)
+            errors.append(f"{currency}: Using static approximate rate (live fetch failed)")
         else:
             errors.append(f"{currency}: Could not retrieve rate")
     
+    for currency in base_currencies:
+        if currency in resolved:
+            rate, used_source, obtained_at = resolved[currency]
+            rates[currency] = RateRecord(currency, quote_currency, rate, used_source, obtained_at)
+    
     status = "All rates fetched successfully" if not errors else "; ".join(errors)
     return rates, status
 
 
+# Uploaded FX datasets already indexed: id -> (dataset, index); the dataset
+# is kept referenced so its id cannot be reused while cached
+_UPLOAD_INDEX_CACHE_SIZE = 8
+_upload_indexes: Dict[int, Tuple[object, FXAverageIndex]] = {}
+_upload_indexes_lock = threading.Lock()
+
+
+def fx_average_index(fx_data) -> FXAverageIndex:
+    """
+    Prefix-sum index for an FX dataset (DataFrame or column dict as stored
+    on FXConfiguration), built once per dataset object. Datasets are treated
+    as immutable once indexed.
+    """
+    if isinstance(fx_data, FXAverageIndex):
+        return fx_data
+    with _upload_indexes_lock:
+        cached = _upload_indexes.get(id(fx_data))
+    if cached is not None and cached[0] is fx_data:
+        return cached[1]
+    
+    fx_df = pd.DataFrame(fx_data) if isinstance(fx_data, dict) else fx_data
+    if 'date' not in fx_df.columns:
+        raise FXError("'date' column not found in FX data")
+    index = FXAverageIndex.from_frame(fx_df)
+    with _upload_indexes_lock:
+        if len(_upload_indexes) >= _UPLOAD_INDEX_CACHE_SIZE:
+            _upload_indexes.pop(next(iter(_upload_indexes)))
+        _upload_indexes[id(fx_data)] = (fx_data, index)
+    return index
+
+
 def calculate_average_fx_from_df(
-    fx_df: pd.DataFrame,
+    fx_df,
     start_date: date,
     end_date: date,
     currency_columns: list[str]
@@ -117,8 +485,14 @@ def calculate_average_fx_from_df(
     """
     Calculate average FX rates from a DataFrame for a given date range.
     
+    The data is indexed once (see FXAverageIndex), so each range query is
+    two binary searches and a subtraction per column. The DataFrame is not
+    modified.
+    
     Args:
-        fx_df: DataFrame with 'date' column and currency columns (e.g., 'AEDUSD')
+        fx_df: DataFrame with 'date' column and currency columns (e.g., 'AEDUSD'),
+            an FXAverageIndex, or None to read the local FX history store
+            (see src/fx_history.py)
         start_date: Start of date range
         end_date: End of date range
         currency_columns: List of column names for currency pairs
@@ -127,88 +501,122 @@ def calculate_average_fx_from_df(
         Tuple of (dict of currency->average_rate, status message)
     """
     try:
-        # Ensure date column is datetime
-        if 'date' not in fx_df.columns:
-            return {}, "Error: 'date' column not found in FX data"
-        
-        fx_df['date'] = pd.to_datetime(fx_df['date']).dt.date
-        
-        # Filter to date range
-        mask = (fx_df['date'] >= start_date) & (fx_df['date'] <= end_date)
-        filtered_df = fx_df[mask]
+        if fx_df is None:
+            index = get_fx_history_store().average_index()
+        else:
+            index = fx_average_index(fx_df)
         
-        if filtered_df.empty:
+        lo, hi = index.rows(start_date, end_date)
+        if hi == lo:
             return {}, f"No FX data found for date range {start_date} to {end_date}"
         
         averages = {}
         missing = []
-        
-        for col in currency_columns:
-            if col in filtered_df.columns:
-                avg = filtered_df[col].mean()
-                if pd.notna(avg):
-                    # Extract currency code from column name (e.g., 'AEDUSD' -> 'AED')
-                    currency = col.replace('USD', '')
-                    averages[currency] = float(avg)
-                else:
-                    missing.append(col)
+        for col, avg in index.averages(start_date, end_date, currency_columns).items():
+            if pd.notna(avg):
+                # Extract currency code from column name (e.g., 'AEDUSD' -> 'AED')
+                currency = col.replace('USD', '')
+                averages[currency] = float(avg)
             else:
                 missing.append(col)
         
-        status = f"Calculated averages from {len(filtered_df)} days"
+        status = f"Calculated averages from {hi - lo} days"
         if missing:
             status += f"; Missing columns: {', '.join(missing)}"
         
         return averages, status
         
+    except FXError as e:
+        return {}, f"Error: {str(e)}"
     except Exception as e:
         return {}, f"Error calculating average FX: {str(e)}"
 
 
+def _cross_fx_rates(
+    usd_rates: Dict[str, RateRecord],
+    required_currencies: list[str],
+    output_currency: str,
+) -> Tuple[Dict[str, RateRecord], list[str]]:
+    """
+    Triangulate rates to USD into rates to the output currency.
+
+    Returns:
+        Tuple of (dict of currency->RateRecord, currencies that could not be crossed)
+    """
+    if output_currency == "USD":
+        return dict(usd_rates), []
+    
+    matrix = FXMatrix.from_rates(usd_rates)
+    output_rate = usd_rates.get(output_currency)
+    rates = {}
+    missing = []
+    for currency in dict.fromkeys(required_currencies):
+        if currency == output_currency:
+            rates[currency] = RateRecord(
+                currency,
+                output_currency,
+                1.0,
+                "identity",
+                output_rate.timestamp if output_rate else datetime.utcnow()
+            )
+            continue
+        if output_rate is None or currency not in matrix or currency not in usd_rates:
+            missing.append(currency)
+            continue
+        legs = [r for r in (usd_rates[currency], output_rate) if r.source != "identity"]
+        sources = list(dict.fromkeys(r.source for r in legs))
+        rates[currency] = RateRecord(
+            currency,
+            output_currency,
+            matrix.rate(currency, output_currency),
+            f"{' & '.join(sources)} (via USD)",
+            min(r.timestamp for r in legs)
+        )
+    return rates, missing
+
+
 def get_fx_rates(
     config: FXConfiguration,
     required_currencies: list[str],
     date_range: Optional[Tuple[date, date]] = None
-) -> Tuple[Dict[str, FXRate], str]:
+) -> Tuple[Dict[str, RateRecord], str]:
     """
     Get FX rates based on configuration mode.
     
+    Live and average rates are obtained against USD once (so pegs and
+    cached rates apply) and triangulated to `config.output_currency`
+    through an FXMatrix, so a non-USD output costs no extra requests.
+    Average cross rates are the ratio of the two USD averages.
+    
     Args:
         config: FX configuration object
         required_currencies: List of currencies needed
         date_range: Optional tuple of (start_date, end_date) for average mode
     
     Returns:
-        Tuple of (dict of currency->FXRate, status message)
+        Tuple of (dict of currency->RateRecord, status message)
     """
     timestamp = datetime.utcnow()
     rates = {}
+    output_currency = config.output_currency.value if isinstance(config.output_currency, Currency) else config.output_currency
+    # Currencies needed against USD: the inputs plus the output currency
+    usd_currencies = list(dict.fromkeys([*required_currencies, output_currency]))
     
     if config.mode == FXMode.LIVE_SPOT:
-        return get_live_fx_rates(
-            required_currencies,
-            config.output_currency.value if isinstance(config.output_currency, Currency) else config.output_currency,
-            config.live_fx_source
-        )
+        usd_rates, status = get_live_fx_rates(usd_currencies, "USD", config.live_fx_source)
+        rates, missing = _cross_fx_rates(usd_rates, required_currencies, output_currency)
+        if missing:
+            status += f"; Could not cross to {output_currency}: {', '.join(missing)}"
+        return rates, status
     
     elif config.mode == FXMode.MANUAL:
         # Use manually provided rates
         for currency in required_currencies:
-            if currency == config.output_currency:
-                rates[currency] = FXRate(
-                    base_currency=currency,
-                    quote_currency=config.output_currency,
-                    rate=1.0,
-                    source="identity",
-                    timestamp=timestamp
-                )
-            elif currency in config.manual_rates:
-                rates[currency] = FXRate(
-                    base_currency=currency,
-                    quote_currency=config.output_currency,
-                    rate=config.manual_rates[currency],
-                    source="manual_entry",
-                    timestamp=timestamp
+            if currency == output_currency:
+                rates[currency] = RateRecord(currency, output_currency, 1.0, "identity", timestamp)
+            elif (config.manual_rates.get(currency) or 0) > 0:
+                rates[currency] = RateRecord(
+                    currency, output_currency, float(config.manual_rates[currency]), "manual_entry", timestamp
                 )
         
         missing = [c for c in required_currencies if c not in rates]
@@ -216,56 +624,61 @@ def get_fx_rates(
         return rates, status
     
     elif config.mode == FXMode.AVERAGE:
-        if config.average_fx_data is None:
-            return {}, "No average FX data provided"
-        
         if date_range is None:
             return {}, "Date range required for average FX calculation"
         
-        # Convert dict back to DataFrame if needed
-        if isinstance(config.average_fx_data, dict):
-            fx_df = pd.DataFrame(config.average_fx_data)
-        else:
-            fx_df = config.average_fx_data
+        # Pegged currencies average to their peg; only floating ones need rates
+        pegs = {c: peg_rate(c, "USD") for c in usd_currencies if c != "USD"}
+        foreign = [c for c, pegged in pegs.items() if pegged is None]
+        sync_status = None
+        if foreign and config.average_fx_data is None:
+            # No upload: fill the local FX history store for the range in bulk
+            _, sync_status = sync_fx_history(
+                get_fx_history_store(),
+                lambda currencies, start, end: fetch_fx_timeseries(currencies, start, end, "USD", config.live_fx_source),
+                foreign,
+                date_range[0],
+                date_range[1],
+            )
         
         # Determine column names
-        currency_columns = [f"{c}USD" for c in required_currencies if c != config.output_currency]
+        currency_columns = [f"{c}USD" for c in foreign]
         
-        averages, status = calculate_average_fx_from_df(
-            fx_df, date_range[0], date_range[1], currency_columns
-        )
-        
-        for currency, rate in averages.items():
-            rates[currency] = FXRate(
-                base_currency=currency,
-                quote_currency=config.output_currency,
-                rate=rate,
-                source=f"average_{date_range[0]}_to_{date_range[1]}",
-                timestamp=timestamp
-            )
-        
-        # Add identity rate for output currency
-        if config.output_currency in required_currencies:
-            rates[str(config.output_currency)] = FXRate(
-                base_currency=config.output_currency,
-                quote_currency=config.output_currency,
-                rate=1.0,
-                source="identity",
-                timestamp=timestamp
+        if foreign:
+            averages, status = calculate_average_fx_from_df(
+                config.average_fx_data, date_range[0], date_range[1], currency_columns
             )
+        else:
+            averages, status = {}, "USD peg rates applied"
+        if sync_status:
+            status = f"{sync_status}; {status}"
         
+        source = f"average_{date_range[0]}_to_{date_range[1]}"
+        usd_rates = {
+            currency: RateRecord(currency, "USD", rate, source, timestamp)
+            for currency, rate in averages.items()
+            if rate > 0
+        }
+        for currency, pegged in pegs.items():
+            if pegged is not None:
+                usd_rates[currency] = RateRecord(currency, "USD", pegged[0], pegged[1], timestamp)
+        if "USD" in usd_currencies:
+            usd_rates["USD"] = RateRecord("USD", "USD", 1.0, "identity", timestamp)
+        rates, missing = _cross_fx_rates(usd_rates, required_currencies, output_currency)
+        if output_currency != "USD" and missing:
+            status += f"; Could not cross to {output_currency}: {', '.join(missing)}"
         return rates, status
     
     return {}, f"Unknown FX mode: {config.mode}"
 
 
-def convert_to_usd(value: Optional[float], fx_rate: Optional[FXRate]) -> Optional[float]:
+def convert_to_usd(value: Optional[float], fx_rate: Optional[RateRecord]) -> Optional[float]:
     """
     Convert a value to USD using the provided FX rate.
     
     Args:
         value: Value in local currency
-        fx_rate: FXRate object with conversion rate
+        fx_rate: Rate record (or FXRate) with conversion rate
     
     Returns:
         Value in USD, or None if conversion not possible
@@ -276,11 +689,14 @@ def convert_to_usd(value: Optional[float], fx_rate: Optional[FXRate]) -> Optiona
     return value * fx_rate.rate
 
 
-def format_fx_rates_summary(rates: Dict[str, FXRate]) -> str:
+def format_fx_rates_summary(rates: Dict[str, RateRecord]) -> str:
     """Generate a human-readable summary of FX rates used."""
     lines = []
     for currency, rate in rates.items():
         if rate.rate == 1.0:
             continue
-        lines.append(f"1 {currency} = {rate.rate:.6f} USD (Source: {rate.source})")
-    return "\n".join(lines) if lines else "All values already in USD"
+        lines.append(f"1 {currency} = {rate.rate:.6f} {rate.quote_currency} (Source: {rate.source})")
+    if lines:
+        return "\n".join(lines)
+    quote = next((rate.quote_currency for rate in rates.values()), "USD")
+    return f"All values already in {quote}"
@@ -0,0 +1,135 @@
+"""
+FX rate cache module.
+USD-pegged currencies resolve from a maintained peg table without network;
+floating rates are cached with a per-currency TTL and persisted to disk so
+restarts start warm. Cached rates keep their original source and timestamp.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+FX_CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "fx_cache.json"
+
+# Official USD pegs: currency -> (units per USD, authority)
+USD_PEGS = {
+    "AED": (3.6725, "Central Bank of the UAE"),
+    "SAR": (3.75, "Saudi Central Bank"),
+    "QAR": (3.64, "Qatar Central Bank"),
+    "HKD": (7.80, "HKMA, 7.75-7.85 band midpoint"),
+}
+
+# Seconds a fetched rate stays fresh, per currency (DEFAULT applies otherwise)
+DEFAULT_FX_TTL_SECONDS = 15 * 60
+FX_TTL_SECONDS = {
+    "KWD": 60 * 60,  # managed basket peg, moves slowly
+}
+
+
+def peg_rate(currency: str, quote_currency: str = "USD") -> Optional[Tuple[float, str]]:
+    """
+    Rate and source label for a pair fixed by USD pegs (USD or a pegged
+    currency on both sides), or None otherwise.
+    """
+    if currency == quote_currency:
+        return None
+    units = {"USD": (1.0, None), **USD_PEGS}
+    if currency not in units or quote_currency not in units:
+        return None
+    base_per_usd, base_authority = units[currency]
+    quote_per_usd, quote_authority = units[quote_currency]
+    authorities = ", ".join(a for a in (base_authority, quote_authority) if a)
+    return quote_per_usd / base_per_usd, f"USD peg ({authorities})"
+
+
+class FXRateCache:
+    """
+    Rates keyed by (base, quote), each with its source, original timestamp
+    and the wall-clock time it was stored, persisted as one JSON file.
+    """
+
+    def __init__(self, path: Path = FX_CACHE_PATH, ttls: Dict[str, float] = None, default_ttl: float = DEFAULT_FX_TTL_SECONDS):
+        """
+        Args:
+            path: JSON file to persist to (None keeps the cache in memory)
+            ttls: Currency -> seconds a rate stays fresh
+            default_ttl: Seconds for currencies not in `ttls`
+        """
+        self.path = Path(path) if path else None
+        self.ttls = dict(FX_TTL_SECONDS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # A corrupt cache file is just a cold start
+            return {}
+
+    def _save_locked(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=2)
+        tmp.replace(self.path)
+
+    def ttl(self, currency: str) -> float:
+        return self.ttls.get(currency, self.default_ttl)
+
+    def get(self, base: str, quote: str) -> Optional[Dict]:
+        """Fresh entry {rate, source, timestamp} for a pair, or None."""
+        with self._lock:
+            entry = self._entries.get(f"{base}/{quote}")
+        if entry is None or time.time() - entry["stored_at"] >= self.ttl(base):
+            return None
+        return entry
+
+    def put_many(self, rates: Dict[str, Tuple[float, str]], quote: str, timestamp: datetime):
+        """Store currency -> (rate, source) fetched at `timestamp`, then persist."""
+        if not rates:
+            return
+        stored_at = time.time()
+        with self._lock:
+            for base, (rate, source) in rates.items():
+                self._entries[f"{base}/{quote}"] = {
+                    "rate": rate,
+                    "source": source,
+                    "timestamp": timestamp.isoformat(),
+                    "stored_at": stored_at,
+                }
+            self._save_locked()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._save_locked()
+
+
+_fx_cache: Optional[FXRateCache] = None
+_fx_cache_lock = threading.Lock()
+
+
+def get_fx_cache() -> FXRateCache:
+    """Get the process-wide FX rate cache."""
+    global _fx_cache
+    with _fx_cache_lock:
+        if _fx_cache is None:
+            _fx_cache = FXRateCache()
+        return _fx_cache
+
+
+def set_fx_cache(cache: FXRateCache):
+    """Replace the process-wide FX rate cache (e.g. in-memory or custom TTLs)."""
+    global _fx_cache
+    with _fx_cache_lock:
+        _fx_cache = cache
@@ -0,0 +1,262 @@
+"""
+Local FX history store.
+Keeps daily rates to a quote currency on disk in the same wide layout as
+data/fx_sample.csv (a 'date' column plus one 'AEDUSD'-style column per
+currency), filled from the providers' time-series endpoints in bulk and
+extended incrementally, and prefix-sum indexes over such tables for O(1)
+period averages.
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .history_store import BACKFILL_TOLERANCE_DAYS
+
+FX_HISTORY_PATH = Path(__file__).resolve().parent.parent / "data" / "fx_history.csv"
+
+# Longest range requested at once (exchangerate.host caps time series at a year)
+FX_TIMESERIES_MAX_DAYS = 365
+
+# Seconds before a column covering up to the requested end is re-synced
+# for newly published days
+FX_HISTORY_REFRESH_SECONDS = 60 * 60
+
+
+def fx_column(currency: str, quote_currency: str = "USD") -> str:
+    """Column name for a currency's rate to the quote currency (e.g. 'AEDUSD')."""
+    return f"{currency}{quote_currency}"
+
+
+@dataclass(frozen=True)
+class FXAverageIndex:
+    """
+    Immutable prefix-sum index over a daily rates table.
+
+    Rows are sorted by date once; per column, the running sum of rates and
+    count of non-missing rates make the average over any inclusive date
+    range two binary searches and a subtraction.
+    """
+
+    dates: np.ndarray  # sorted datetime64[D], shape (n_rows,)
+    columns: List[str]
+    # rate_prefix[r, c] / count_prefix[r, c]: sum / count of column c's rates in rows [0, r)
+    rate_prefix: np.ndarray = field(repr=False)
+    count_prefix: np.ndarray = field(repr=False)
+
+    @classmethod
+    def from_frame(cls, fx_df: pd.DataFrame) -> "FXAverageIndex":
+        """Build from a table with a 'date' column and rate columns (the table is not modified)."""
+        columns = [c for c in fx_df.columns if c != "date"]
+        dates = pd.to_datetime(fx_df["date"]).to_numpy().astype("datetime64[D]")
+        order = np.argsort(dates, kind="stable")
+        rates = np.column_stack([
+            pd.to_numeric(fx_df[c], errors="coerce").to_numpy(dtype=float)[order] for c in columns
+        ]) if columns else np.empty((len(dates), 0))
+        valid = ~np.isnan(rates)
+        rate_prefix = np.zeros((len(dates) + 1, len(columns)))
+        count_prefix = np.zeros((len(dates) + 1, len(columns)), dtype=np.int64)
+        np.cumsum(np.where(valid, rates, 0.0), axis=0, out=rate_prefix[1:])
+        np.cumsum(valid, axis=0, out=count_prefix[1:])
+        return cls(dates=dates[order], columns=columns, rate_prefix=rate_prefix, count_prefix=count_prefix)
+
+    def rows(self, start: date, end: date) -> Tuple[int, int]:
+        """Row slice [lo, hi) of the inclusive date range."""
+        lo = np.searchsorted(self.dates, np.datetime64(start, "D"), side="left")
+        hi = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right")
+        return int(lo), int(max(lo, hi))
+
+    def averages(self, start: date, end: date, columns: List[str]) -> Dict[str, float]:
+        """Mean rate per requested column over [start, end] (NaN if no rates or unknown column)."""
+        lo, hi = self.rows(start, end)
+        positions = {c: i for i, c in enumerate(self.columns)}
+        result = {}
+        for column in columns:
+            i = positions.get(column)
+            count = self.count_prefix[hi, i] - self.count_prefix[lo, i] if i is not None else 0
+            result[column] = (self.rate_prefix[hi, i] - self.rate_prefix[lo, i]) / count if count else float("nan")
+        return result
+
+
+class FXHistoryStore:
+    """
+    One wide CSV of daily rates plus a JSON sidecar recording, per column,
+    which date range has been requested and when it was last synced.
+    """
+
+    def __init__(self, path: Path = FX_HISTORY_PATH):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        # (file mtime, index) of the last index built from the stored table
+        self._index: Optional[Tuple[int, FXAverageIndex]] = None
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.path.with_suffix(".json")
+
+    def load(self) -> pd.DataFrame:
+        """Load the stored rates (a 'date' column plus rate columns)."""
+        if not self.path.exists():
+            return pd.DataFrame(columns=["date"])
+        df = pd.read_csv(self.path)
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+        return df
+
+    def average_index(self) -> FXAverageIndex:
+        """Prefix-sum index of the stored table, rebuilt only when the file changes."""
+        mtime = self.path.stat().st_mtime_ns if self.path.exists() else None
+        cached = self._index
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        index = FXAverageIndex.from_frame(self.load())
+        self._index = (mtime, index)
+        return index
+
+    def load_meta(self) -> Dict[str, Dict]:
+        """Load per-column coverage metadata."""
+        if not self._meta_path.exists():
+            return {}
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, df: pd.DataFrame, meta: Dict[str, Dict]):
+        """Write the rates and their coverage metadata."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        df.to_csv(tmp, index=False)
+        tmp.replace(self.path)
+        with open(self._meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+
+def merge_fx_history(stored: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Merge downloaded rates (indexed by date) into the stored table; new values win."""
+    if new is None or new.empty:
+        return stored
+    new = new.copy()
+    new.index = pd.to_datetime(new.index).date
+    merged = stored.set_index("date") if "date" in stored.columns else stored
+    merged = new.combine_first(merged)
+    merged.index.name = "date"
+    return merged.sort_index().reset_index()
+
+
+def _missing_ranges(meta: Dict, start: date, end: date, now: float) -> List[Tuple[date, date]]:
+    """Date ranges a column still needs (backfill and/or delta)."""
+    if not meta.get("covered_from"):
+        return [(start, end)]
+    covered_from = date.fromisoformat(meta["covered_from"])
+    covered_to = date.fromisoformat(meta["covered_to"])
+    ranges = []
+    if covered_from > start + timedelta(days=BACKFILL_TOLERANCE_DAYS):
+        ranges.append((start, covered_from - timedelta(days=1)))
+    if end > covered_to or (end == covered_to and now - meta.get("synced_at", 0) >= FX_HISTORY_REFRESH_SECONDS):
+        # Re-request the last covered day so a rate published late is picked up
+        ranges.append((min(covered_to, end), end))
+    return ranges
+
+
+def sync_fx_history(
+    store: FXHistoryStore,
+    download: Callable[[List[str], date, date], pd.DataFrame],
+    currencies: List[str],
+    start: date,
+    end: date,
+    quote_currency: str = "USD",
+) -> Tuple[pd.DataFrame, str]:
+    """
+    Bring the stored rates for `currencies` up to date over [start, end].
+
+    Currencies missing the same date range are requested together, one
+    request per range (split into FX_TIMESERIES_MAX_DAYS chunks), so a
+    cold fill costs one request per year of history, not one per day.
+
+    Args:
+        store: FX history store to read and update
+        download: Callable (currencies, from, to) -> DataFrame indexed by
+            date with one column of rates to the quote currency per currency
+        currencies: Currency codes needed
+        start: First date needed
+        end: Last date needed
+        quote_currency: Currency the rates are quoted in
+
+    Returns:
+        Tuple of (stored rates table, status message)
+    """
+    currencies = [c for c in dict.fromkeys(currencies) if c != quote_currency]
+    with store.lock:
+        stored = store.load()
+        meta = store.load_meta()
+        now = time.time()
+
+        # (from, to) -> currencies needing that range
+        by_range: Dict[Tuple[date, date], List[str]] = {}
+        for currency in currencies:
+            for date_range in _missing_ranges(meta.get(fx_column(currency, quote_currency), {}), start, end, now):
+                by_range.setdefault(date_range, []).append(currency)
+
+        errors = []
+        requests_made = 0
+        for (range_start, range_end), pending in by_range.items():
+            chunk_start = range_start
+            while chunk_start <= range_end:
+                chunk_end = min(range_end, chunk_start + timedelta(days=FX_TIMESERIES_MAX_DAYS - 1))
+                try:
+                    fetched = download(pending, chunk_start, chunk_end)
+                    requests_made += 1
+                except Exception as e:
+                    errors.append(f"{chunk_start} to {chunk_end}: {e}")
+                    chunk_start = chunk_end + timedelta(days=1)
+                    continue
+                fetched = fetched.rename(columns={c: fx_column(c, quote_currency) for c in fetched.columns})
+                stored = merge_fx_history(stored, fetched)
+                # A currency the providers did not return stays uncovered (and
+                # is retried); an empty table means a provider answered that
+                # the range has no rates at all (failures raise instead)
+                covered = pending if fetched.empty else [c for c in pending if fx_column(c, quote_currency) in fetched.columns]
+                for currency in covered:
+                    column_meta = meta.setdefault(fx_column(currency, quote_currency), {})
+                    covered_from = column_meta.get("covered_from")
+                    covered_to = column_meta.get("covered_to")
+                    column_meta["covered_from"] = min(covered_from, chunk_start.isoformat()) if covered_from else chunk_start.isoformat()
+                    column_meta["covered_to"] = max(covered_to, chunk_end.isoformat()) if covered_to else chunk_end.isoformat()
+                    column_meta["synced_at"] = now
+                chunk_start = chunk_end + timedelta(days=1)
+
+        if requests_made:
+            store.save(stored, meta)
+
+    if errors:
+        status = f"FX history refresh failed for {'; '.join(errors)}"
+    elif requests_made:
+        status = f"FX history synced ({requests_made} request{'s' if requests_made != 1 else ''})"
+    else:
+        status = "FX history up to date"
+    return stored, status
+
+
+_fx_history_store: Optional[FXHistoryStore] = None
+_fx_history_store_lock = threading.Lock()
+
+
+def get_fx_history_store() -> FXHistoryStore:
+    """Get the process-wide FX history store."""
+    global _fx_history_store
+    with _fx_history_store_lock:
+        if _fx_history_store is None:
+            _fx_history_store = FXHistoryStore()
+        return _fx_history_store
+
+
+def set_fx_history_store(store: FXHistoryStore):
+    """Replace the process-wide FX history store (e.g. a temporary path)."""
+    global _fx_history_store
+    with _fx_history_store_lock:
+        _fx_history_store = store
@@ -0,0 +1,81 @@
+"""
+FX cross-rate matrix module.
+Holds every known rate as one vector on a common base currency, so any
+pair is derived by triangulation and whole value columns convert to an
+output currency in a single broadcast operation.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Sequence, Union
+
+import numpy as np
+
+# Output currencies offered for reports
+REPORT_CURRENCIES = ["USD", "AED", "SAR", "EUR"]
+
+
+@dataclass(frozen=True, eq=False)
+class FXMatrix:
+    """
+    Rates of many currencies against one base currency (compared by identity).
+
+    `to_base[i]` is the value of one unit of `currencies[i]` in the base
+    currency; the rate for any pair (a -> b) is to_base[a] / to_base[b].
+    """
+
+    currencies: List[str]
+    to_base: np.ndarray  # float64, shape (n_currencies,)
+    base: str = "USD"
+    _positions: Dict[str, int] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self._positions is None:
+            object.__setattr__(self, "_positions", {c: i for i, c in enumerate(self.currencies)})
+
+    @classmethod
+    def from_rates(cls, rates: Mapping[str, Union[float, object]], base: str = "USD") -> "FXMatrix":
+        """
+        Build from currency -> rate to `base` (floats or objects with a
+        `.rate`, e.g. FXRate). The base currency is always included at 1.0.
+        """
+        values = {base: 1.0}
+        for currency, rate in rates.items():
+            value = getattr(rate, "rate", rate)
+            if value is not None and value > 0:
+                values[str(getattr(currency, "value", currency))] = float(value)
+        return cls(currencies=list(values), to_base=np.array(list(values.values()), dtype=float), base=base)
+
+    def __contains__(self, currency: str) -> bool:
+        return currency in self._positions
+
+    def index_of(self, currencies: Union[str, Sequence[str]]) -> np.ndarray:
+        """Positions of currencies in the matrix (KeyError if one is unknown)."""
+        if isinstance(currencies, str):
+            return np.array(self._positions[currencies])
+        return np.array([self._positions[c] for c in currencies], dtype=np.int64)
+
+    def rate(self, base_currency: str, quote_currency: str) -> float:
+        """Triangulated rate (units of quote per unit of base)."""
+        return float(self.to_base[self._positions[base_currency]] / self.to_base[self._positions[quote_currency]])
+
+    def rates_to(self, quote_currency: str, currencies: Sequence[str] = None) -> Dict[str, float]:
+        """Rate of each currency (all known by default) to one quote currency."""
+        currencies = list(self.currencies if currencies is None else currencies)
+        rates = self.to_base[self.index_of(currencies)] / self.to_base[self._positions[quote_currency]]
+        return dict(zip(currencies, rates.tolist()))
+
+    def convert(self, values, from_currencies: Union[str, Sequence[str]], to_currency: str) -> np.ndarray:
+        """
+        Convert values to `to_currency` in one broadcast operation.
+
+        Args:
+            values: Array-like of amounts (NaN/None stay NaN)
+            from_currencies: One currency for all values, or one per value
+            to_currency: Output currency
+
+        Returns:
+            Float array of converted amounts
+        """
+        values = np.asarray(values, dtype=float)
+        factors = self.to_base[self.index_of(from_currencies)] / self.to_base[self._positions[to_currency]]
+        return values * factors
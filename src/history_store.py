@@ -0,0 +1,215 @@
+"""
+Local price history store.
+Keeps downloaded daily OHLCV per index on disk (Parquet, CSV fallback)
+so refreshes only request the rows after the last stored date.
+"""
+
+import json
+import re
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+# Parquet needs pyarrow; fall back to CSV when it is not installed
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+HISTORY_DIR = Path(__file__).resolve().parent.parent / "data" / "history"
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Stored coverage may start a few days after the requested start
+# (holidays/weekends) without triggering a backfill request
+BACKFILL_TOLERANCE_DAYS = 7
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9_]+", "_", text.lower()).strip("_")
+
+
+def history_key(index_name: str, country: str) -> str:
+    """Build a filesystem-safe store key for an index."""
+    return _slug(f"{country}__{index_name}")
+
+
+class HistoryStore:
+    """
+    One file per index holding its daily OHLCV series, plus a small JSON
+    sidecar recording which date range has already been requested.
+    """
+
+    def __init__(self, root: Path = HISTORY_DIR):
+        self.root = Path(root)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def lock(self, key: str) -> threading.Lock:
+        """Per-key lock so concurrent refreshes of one index do not race."""
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _data_path(self, key: str) -> Path:
+        suffix = ".parquet" if PARQUET_AVAILABLE else ".csv"
+        return self.root / f"{key}{suffix}"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def load(self, key: str) -> pd.DataFrame:
+        """Load the stored series for a key (empty DataFrame if none)."""
+        path = self._data_path(key)
+        if not path.exists():
+            return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+        if PARQUET_AVAILABLE:
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, index_col=0, parse_dates=True)
+        df.index = pd.DatetimeIndex(df.index, name="Date")
+        return df
+
+    def load_meta(self, key: str) -> Dict:
+        """Load coverage metadata for a key."""
+        path = self._meta_path(key)
+        if not path.exists():
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def updated_at(self, key: str) -> Optional[str]:
+        """ISO time the stored series was last written (None if nothing is stored)."""
+        updated = self.load_meta(key).get("updated_at")
+        if updated:
+            return updated
+        path = self._data_path(key)
+        return datetime.fromtimestamp(path.stat().st_mtime).isoformat() if path.exists() else None
+
+    def save(self, key: str, df: pd.DataFrame, covered_from: date, covered_to: date):
+        """Write the series and its coverage metadata."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._data_path(key)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        if PARQUET_AVAILABLE:
+            df.to_parquet(tmp)
+        else:
+            df.to_csv(tmp)
+        tmp.replace(path)
+
+        meta = {
+            "covered_from": covered_from.isoformat(),
+            "covered_to": covered_to.isoformat(),
+            "rows": len(df),
+            "updated_at": datetime.now().isoformat(),
+        }
+        with open(self._meta_path(key), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+
+def merge_history(stored: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Merge a downloaded slice into the stored series; new rows win on overlap."""
+    if new is None or new.empty:
+        return stored
+    new = new[[c for c in OHLCV_COLUMNS if c in new.columns]].copy()
+    new.index = pd.DatetimeIndex(new.index, name="Date")
+    if stored.empty:
+        return new.sort_index()
+    merged = pd.concat([stored, new])
+    merged = merged[~merged.index.duplicated(keep="last")]
+    return merged.sort_index()
+
+
+def sync_history(
+    store: HistoryStore,
+    key: str,
+    download: Callable[[date, date], pd.DataFrame],
+    start: date,
+    end: date,
+) -> Tuple[pd.DataFrame, str]:
+    """
+    Bring the stored series for `key` up to date and return it.
+
+    Only missing ranges are requested: a backfill if the store does not
+    reach back to `start`, and a delta from the last stored row to `end`.
+    The last stored row is re-requested so a partial session is replaced.
+
+    Args:
+        store: History store to read and update
+        key: Store key (see history_key)
+        download: Callable fetching OHLCV for an inclusive (from, to) range
+        start: First date the caller needs
+        end: Last date the caller needs (usually today)
+
+    Returns:
+        Tuple of (merged series, status message). The series' attrs carry
+        `updated_at` (when the store was last written successfully) and,
+        if a download failed, `refresh_error`
+
+    Raises:
+        The download error, if it failed and nothing is stored yet
+    """
+    with store.lock(key):
+        stored = store.load(key)
+        meta = store.load_meta(key)
+
+        covered_from = date.fromisoformat(meta["covered_from"]) if meta.get("covered_from") else None
+        if stored.empty:
+            covered_from = None
+
+        ranges = []
+        if covered_from is None:
+            ranges.append((start, end))
+        else:
+            if covered_from > start + timedelta(days=BACKFILL_TOLERANCE_DAYS):
+                ranges.append((start, covered_from - timedelta(days=1)))
+            last_row = stored.index[-1].date()
+            if last_row <= end:
+                # Providers reject empty ranges, so always span at least one day
+                ranges.append((min(last_row, end - timedelta(days=1)), end))
+
+        errors = []
+        merged = stored
+        new_from = covered_from
+        new_to = date.fromisoformat(meta["covered_to"]) if meta.get("covered_to") and covered_from else None
+        for range_start, range_end in ranges:
+            try:
+                merged = merge_history(merged, download(range_start, range_end))
+            except Exception as e:
+                errors.append(e)
+                continue
+            new_from = range_start if new_from is None else min(new_from, range_start)
+            new_to = range_end if new_to is None else max(new_to, range_end)
+
+        if merged.empty:
+            if errors:
+                # Nothing stored to fall back on: surface the provider error
+                raise errors[0]
+            return merged, "No data returned"
+
+        if len(errors) < len(ranges):
+            store.save(key, merged, new_from, new_to)
+
+        merged.attrs["updated_at"] = store.updated_at(key)
+        if errors:
+            merged.attrs["refresh_error"] = str(errors[0])
+        status = "Success" if not errors else f"Using stored history; refresh failed: {errors[0]}"
+        return merged, status
+
+
+_stores: Dict[str, HistoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_history_store(namespace: str = "default") -> HistoryStore:
+    """Get the process-wide history store for a namespace (one per provider)."""
+    with _stores_lock:
+        store = _stores.get(namespace)
+        if store is None:
+            store = HistoryStore(HISTORY_DIR / _slug(namespace))
+            _stores[namespace] = store
+        return store
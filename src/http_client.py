@@ -0,0 +1,186 @@
+"""
+Shared HTTP client module.
+One pooled, keep-alive session for all outbound HTTP, with retries using
+exponential backoff and jitter, a total deadline per call, and counters
+for connection reuse and retries.
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    When and how long to wait before retrying a request.
+
+    The wait before retry n (1-based) is a uniformly random time between 0
+    and min(max_backoff, backoff * 2 ** (n - 1)) ("full jitter").
+    """
+
+    max_retries: int = 2
+    backoff: float = 0.25
+    max_backoff: float = 4.0
+    retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    def delay(self, attempt: int, rng: random.Random) -> float:
+        return rng.uniform(0.0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised when a call's total deadline passes before a response arrives."""
+    pass
+
+
+class HTTPClient:
+    """
+    Thread-safe pooled HTTP client.
+
+    Connections are kept alive and pooled per host (up to `pool_maxsize`
+    each). Connection errors, timeouts and retryable statuses are retried
+    per the policy while the call's deadline allows.
+    """
+
+    def __init__(
+        self,
+        retry_policy: RetryPolicy = RetryPolicy(),
+        pool_connections: int = 16,
+        pool_maxsize: int = 16,
+        default_timeout: float = 15.0,
+        default_deadline: Optional[float] = 30.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            retry_policy: Retry and backoff settings
+            pool_connections: Number of hosts with pooled connections
+            pool_maxsize: Connections kept alive per host
+            default_timeout: Per-attempt timeout (seconds) if none is given
+            default_deadline: Total time budget per call (None for no limit)
+            seed: Random seed for reproducible jitter
+        """
+        self.retry_policy = retry_policy
+        self.default_timeout = default_timeout
+        self.default_deadline = default_deadline
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._session = requests.Session()
+        self._session.mount("http://", self._adapter)
+        self._session.mount("https://", self._adapter)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counts = {"calls": 0, "attempts": 0, "retries": 0, "failures": 0, "deadline_exceeded": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Send a request, retrying transient failures.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            timeout: Per-attempt timeout in seconds
+            deadline: Total seconds for all attempts and backoff waits
+            retry_policy: Override the client's retry policy for this call
+            **kwargs: Passed to requests (params, headers, ...)
+
+        Returns:
+            The last response (which may carry a retryable error status
+            once retries are exhausted)
+
+        Raises:
+            DeadlineExceeded: if the deadline passes between attempts
+            requests.exceptions.RequestException: if the last attempt failed
+        """
+        policy = retry_policy or self.retry_policy
+        timeout = timeout if timeout is not None else self.default_timeout
+        deadline = deadline if deadline is not None else self.default_deadline
+        give_up_at = time.monotonic() + deadline if deadline is not None else None
+        self._count("calls")
+
+        attempt = 0
+        while True:
+            attempt_timeout = timeout
+            if give_up_at is not None:
+                remaining = give_up_at - time.monotonic()
+                if remaining <= 0:
+                    self._count("deadline_exceeded")
+                    self._count("failures")
+                    raise DeadlineExceeded(f"Deadline of {deadline:.1f}s exceeded for {url}")
+                attempt_timeout = min(timeout, remaining)
+
+            self._count("attempts")
+            try:
+                response = self._session.request(method, url, timeout=attempt_timeout, **kwargs)
+                error = None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                response, error = None, e
+
+            retryable = error is not None or response.status_code in policy.retry_statuses
+            if not retryable or attempt >= policy.max_retries:
+                if error is not None:
+                    self._count("failures")
+                    raise error
+                return response
+
+            attempt += 1
+            with self._lock:
+                self._counts["retries"] += 1
+                wait = policy.delay(attempt, self._rng)
+            if give_up_at is not None:
+                wait = min(wait, max(0.0, give_up_at - time.monotonic()))
+            time.sleep(wait)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        """Call/retry counters plus connections opened vs. reused across pools."""
+        with self._lock:
+            counts = dict(self._counts)
+        opened = sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+        counts["connections_opened"] = opened
+        counts["connections_reused"] = max(0, sent - opened)
+        return counts
+
+
+_client: Optional[HTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """Get the process-wide HTTP client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
+
+
+def set_http_client(client: HTTPClient):
+    """Replace the process-wide HTTP client (e.g. with a different retry policy)."""
+    global _client
+    with _client_lock:
+        _client = client
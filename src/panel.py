@@ -0,0 +1,417 @@
+"""
+Panel computation module.
+Aligns every index's daily closes and volumes into one date x index matrix
+and computes period returns, average volumes and traded value (ADTV) for
+all indices at once.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .calendars import TradingCalendar
+from .quality import scan_panel
+
+# Trailing session windows reported for rolling ADTV
+ROLLING_ADTV_WINDOWS = (20, 60, 120)
+
+# Trailing return periods: label -> calendar months back from the as-of date
+PERFORMANCE_PERIODS = {"1m": 1, "3m": 3, "6m": 6, "1y": 12, "3y": 36}
+
+# Sessions per year used to annualize daily volatility
+TRADING_DAYS_PER_YEAR = 252
+
+# A session uses the latest FX rate at most this many days old (FX sources
+# skip weekends and holidays that some markets trade on)
+FX_ASOF_MAX_DAYS = 7
+
+
+@dataclass(frozen=True)
+class PricePanel:
+    """
+    Date x index matrices on the union of all trading sessions.
+
+    Markets trade on different calendars (e.g. Tadawul Sun-Thu, NYSE
+    Mon-Fri), so a cell is NaN when that index had no session on that
+    date. Values are never forward-filled: period start/end prices are
+    each index's own first/last session inside the period.
+
+    Daily traded value is volume x that day's close. Its prefix sums, and
+    those of daily log returns, are built once per panel, so ADTV and
+    volatility over any period or trailing window are O(1) per index.
+
+    With `fx_to_usd` (each index's currency rate to USD on each date), the
+    daily traded value is also converted at each day's rate, giving a
+    daily-FX ADTV next to the local one.
+    """
+
+    dates: np.ndarray  # sorted datetime64[D], shape (n_dates,)
+    keys: List[str]
+    close: np.ndarray  # float64, shape (n_dates, n_keys)
+    volume: np.ndarray  # float64, shape (n_dates, n_keys)
+    # value_count[r, c]: sessions with traded value in rows [0, r), shape (n_dates + 1, n_keys)
+    value_count: np.ndarray = field(default=None, repr=False)
+    # value_prefix[k, c]: summed traded value of column c's first k valued sessions
+    value_prefix: np.ndarray = field(default=None, repr=False)
+    # last_session[r, c]: latest row <= r where column c has a close, -1 if none
+    last_session: np.ndarray = field(default=None, repr=False)
+    # return_prefix[i, r, c]: count / sum / sum of squares (i = 0, 1, 2) of
+    # daily log returns in rows [0, r), shape (3, n_dates + 1, n_keys)
+    return_prefix: np.ndarray = field(default=None, repr=False)
+    # fx_to_usd[r, c]: column c's currency rate to USD on row r (NaN if unknown)
+    fx_to_usd: Optional[np.ndarray] = field(default=None, repr=False)
+    # As value_count / value_prefix, for traded value converted at daily FX
+    usd_value_count: np.ndarray = field(default=None, repr=False)
+    usd_value_prefix: np.ndarray = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.value_count is None or self.value_prefix is None:
+            value_count, value_prefix = _traded_value_prefix(self.close, self.volume)
+            object.__setattr__(self, "value_count", value_count)
+            object.__setattr__(self, "value_prefix", value_prefix)
+        if self.last_session is None or self.return_prefix is None:
+            last_session, return_prefix = _log_return_prefix(self.close)
+            object.__setattr__(self, "last_session", last_session)
+            object.__setattr__(self, "return_prefix", return_prefix)
+        if self.fx_to_usd is not None and (self.usd_value_count is None or self.usd_value_prefix is None):
+            usd_value_count, usd_value_prefix = _traded_value_prefix(self.close * self.fx_to_usd, self.volume)
+            object.__setattr__(self, "usd_value_count", usd_value_count)
+            object.__setattr__(self, "usd_value_prefix", usd_value_prefix)
+
+    @classmethod
+    def from_histories(
+        cls,
+        histories: Dict[str, pd.DataFrame],
+        fx_to_usd: Dict[str, pd.Series] = None,
+    ) -> "PricePanel":
+        """
+        Build a panel from per-index daily histories (Close, optional Volume).
+
+        Args:
+            histories: Index key -> daily history
+            fx_to_usd: Index key -> daily rate of its currency to USD, joined
+                to the sessions as of each date (keys without one get no
+                daily-FX values)
+        """
+        keys = list(histories.keys())
+        day_arrays = [
+            histories[key].index.values.astype("datetime64[D]")
+            for key in keys
+        ]
+        if day_arrays:
+            dates = np.unique(np.concatenate(day_arrays))
+        else:
+            dates = np.array([], dtype="datetime64[D]")
+
+        close = np.full((len(dates), len(keys)), np.nan)
+        volume = np.full((len(dates), len(keys)), np.nan)
+        for col, (key, days) in enumerate(zip(keys, day_arrays)):
+            df = histories[key]
+            rows = np.searchsorted(dates, days)
+            close[rows, col] = df["Close"].to_numpy(dtype=float)
+            if "Volume" in df.columns:
+                volume[rows, col] = df["Volume"].to_numpy(dtype=float)
+
+        fx = None
+        if fx_to_usd:
+            fx = np.full((len(dates), len(keys)), np.nan)
+            for col, key in enumerate(keys):
+                series = fx_to_usd.get(key)
+                if series is not None and len(series):
+                    fx[:, col] = _asof_rates(dates, series)
+
+        return cls(dates=dates, keys=keys, close=close, volume=volume, fx_to_usd=fx)
+
+    def period_stats(self, start: date, end: date) -> Dict[str, np.ndarray]:
+        """
+        Compute per-index statistics for an inclusive date range.
+
+        Returns:
+            Dict of arrays (one entry per key): start_price, end_price,
+            return_pct, avg_volume, adtv, adtv_usd_daily, data_points,
+            start_date, end_date. adtv is the mean daily traded value
+            (volume x close, local currency) over sessions reporting volume;
+            adtv_usd_daily the same with each day converted at that day's
+            FX rate (NaN unless every valued session has a rate).
+            Indices without sessions in the range get NaN / NaT / 0.
+        """
+        lo = np.searchsorted(self.dates, np.datetime64(start, "D"), side="left")
+        hi = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right")
+        n_keys = len(self.keys)
+
+        close = self.close[lo:hi]
+        volume = self.volume[lo:hi]
+        dates = self.dates[lo:hi]
+
+        valid = ~np.isnan(close)
+        has_data = valid.any(axis=0)
+        data_points = valid.sum(axis=0)
+
+        start_price = np.full(n_keys, np.nan)
+        end_price = np.full(n_keys, np.nan)
+        start_date = np.full(n_keys, np.datetime64("NaT"), dtype="datetime64[D]")
+        end_date = np.full(n_keys, np.datetime64("NaT"), dtype="datetime64[D]")
+        if len(close):
+            # First/last session per column inside the window
+            first_row = np.argmax(valid, axis=0)
+            last_row = len(close) - 1 - np.argmax(valid[::-1], axis=0)
+            cols = np.arange(n_keys)
+            start_price = np.where(has_data, close[first_row, cols], np.nan)
+            end_price = np.where(has_data, close[last_row, cols], np.nan)
+            start_date = np.where(has_data, dates[first_row], np.datetime64("NaT"))
+            end_date = np.where(has_data, dates[last_row], np.datetime64("NaT"))
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return_pct = (end_price - start_price) / start_price * 100
+
+            # Average volume only where the source reports volume for the period
+            volume_valid = ~np.isnan(volume)
+            volume_sum = np.where(volume_valid, volume, 0.0).sum(axis=0)
+            volume_count = volume_valid.sum(axis=0)
+            avg_volume = np.where(volume_sum > 0, volume_sum / volume_count, np.nan)
+
+            adtv = _period_mean(self.value_count, self.value_prefix, lo, hi)
+            # Only when every valued session has a daily rate; a mean over
+            # the FX-covered subset would not be the period's ADTV
+            fx_missing = self.fx_missing_sessions(lo, hi)
+            if self.fx_to_usd is not None:
+                adtv_usd_daily = np.where(
+                    fx_missing == 0,
+                    _period_mean(self.usd_value_count, self.usd_value_prefix, lo, hi),
+                    np.nan,
+                )
+            else:
+                adtv_usd_daily = np.full(n_keys, np.nan)
+
+        return {
+            "start_price": start_price,
+            "end_price": end_price,
+            "return_pct": return_pct,
+            "avg_volume": avg_volume,
+            "adtv": adtv,
+            "adtv_usd_daily": adtv_usd_daily,
+            "data_points": data_points,
+            "start_date": start_date,
+            "end_date": end_date,
+        }
+
+    def fx_missing_sessions(self, lo: int, hi: int) -> np.ndarray:
+        """Valued sessions in rows [lo, hi) without a daily FX rate (0 without FX data)."""
+        if self.fx_to_usd is None:
+            return np.zeros(len(self.keys), dtype=np.int64)
+        valued = self.value_count[hi] - self.value_count[lo]
+        converted = self.usd_value_count[hi] - self.usd_value_count[lo]
+        return valued - converted
+
+    def trailing_adtv(self, window: int, end: date) -> np.ndarray:
+        """
+        Mean daily traded value over each index's last `window` sessions
+        with volume on or before `end`; NaN where fewer sessions exist.
+        """
+        hi = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right")
+        cols = np.arange(len(self.keys))
+        last_valued = self.value_count[hi]
+        first_valued = np.maximum(last_valued - window, 0)
+        with np.errstate(invalid="ignore"):
+            value_sum = self.value_prefix[last_valued, cols] - self.value_prefix[first_valued, cols]
+            return np.where(last_valued >= window, value_sum / window, np.nan)
+
+    def price_on(self, days: np.ndarray) -> np.ndarray:
+        """
+        Each index's close at its last session on or before each date.
+
+        Args:
+            days: datetime64[D] array, shape (n_days,)
+
+        Returns:
+            float array, shape (n_days, n_keys); NaN before an index's first session
+        """
+        if not len(self.dates):
+            return np.full((len(days), len(self.keys)), np.nan)
+        rows = np.searchsorted(self.dates, days, side="right") - 1
+        sessions = np.where(rows[:, None] >= 0, self.last_session[np.maximum(rows, 0)], -1)
+        prices = self.close[np.maximum(sessions, 0), np.arange(len(self.keys))]
+        return np.where(sessions >= 0, prices, np.nan)
+
+    def performance_stats(self, as_of: date, periods: Dict[str, int] = PERFORMANCE_PERIODS) -> Dict[str, np.ndarray]:
+        """
+        Trailing returns and annualized volatility as of a date.
+
+        Each return runs from an index's last session on or before
+        `as_of` minus the period to its last session on or before `as_of`;
+        it is NaN when the history does not reach back that far. Volatility
+        is the annualized standard deviation of daily log returns over the
+        trailing year.
+
+        Returns:
+            Dict of arrays (one entry per key): return_<label> for each
+            period (percent) and volatility_1y (percent)
+        """
+        end = pd.Timestamp(as_of)
+        starts = [end - pd.DateOffset(months=months) for months in periods.values()]
+        days = np.array([end, *starts], dtype="datetime64[D]")
+        prices = self.price_on(days)
+
+        stats = {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for i, label in enumerate(periods, start=1):
+                stats[f"return_{label}"] = (prices[0] - prices[i]) / prices[i] * 100
+
+            # Returns ending in (as_of - 1 year, as_of]
+            window = np.array([end - pd.DateOffset(years=1), end], dtype="datetime64[D]")
+            lo, hi = np.searchsorted(self.dates, window, side="right")
+            count, total, squares = self.return_prefix[:, hi] - self.return_prefix[:, lo]
+            variance = (squares - total * total / count) / (count - 1)
+            volatility = np.sqrt(np.maximum(variance, 0.0) * TRADING_DAYS_PER_YEAR) * 100
+            stats["volatility_1y"] = np.where(count >= 2, volatility, np.nan)
+        return stats
+
+    def year_stats(
+        self,
+        years: List[int],
+        today: date = None,
+        adtv_windows: Sequence[int] = ROLLING_ADTV_WINDOWS,
+        calendars: Dict[str, TradingCalendar] = None,
+    ) -> Dict[int, Dict[str, Dict]]:
+        """
+        Per-calendar-year stats for every index, in the result format used
+        by the data fetcher. For the current year the period ends today.
+        Rolling ADTV (`adtv_<n>d`), trailing returns (`return_<period>`)
+        and `volatility_1y` are taken as of each period's end.
+        Each stats dict carries a `quality` report for the period (see
+        src/quality.py); `calendars` gives each index's trading calendar.
+
+        Returns:
+            Dict of year -> {key -> stats dict}; indices without data are omitted
+        """
+        today = today or date.today()
+        by_year = {}
+        for year in years:
+            period_end = min(date(year, 12, 31), today)
+            period = self.period_stats(date(year, 1, 1), period_end)
+            trailing = {window: self.trailing_adtv(window, period_end) for window in adtv_windows}
+            performance = self.performance_stats(period_end)
+            quality = scan_panel(self, date(year, 1, 1), period_end, calendars)
+            year_results = {}
+            for col, key in enumerate(self.keys):
+                if period["data_points"][col] == 0:
+                    continue
+                avg_volume = period["avg_volume"][col]
+                year_results[key] = {
+                    "current_price": float(period["end_price"][col]),
+                    "year_start_price": float(period["start_price"][col]),
+                    "ytd_percent": round(float(period["return_pct"][col]), 2),
+                    "avg_volume": _optional_float(avg_volume),
+                    "adtv": _optional_float(period["adtv"][col]),
+                    "adtv_usd_daily": _optional_float(period["adtv_usd_daily"][col]),
+                    "data_points": int(period["data_points"][col]),
+                    "start_date": str(period["start_date"][col]),
+                    "end_date": str(period["end_date"][col]),
+                    **{f"adtv_{window}d": _optional_float(values[col]) for window, values in trailing.items()},
+                    **{name: _optional_round(values[col]) for name, values in performance.items()},
+                    "quality": {name: int(values[col]) for name, values in quality.items()},
+                }
+            by_year[year] = year_results
+        return by_year
+
+
+def _period_mean(count: np.ndarray, prefix: np.ndarray, lo: int, hi: int) -> np.ndarray:
+    """Mean value per column over rows [lo, hi) from value_count/value_prefix style sums."""
+    cols = np.arange(count.shape[1])
+    first_valued = count[lo]
+    last_valued = count[hi]
+    sessions = last_valued - first_valued
+    with np.errstate(invalid="ignore", divide="ignore"):
+        total = prefix[last_valued, cols] - prefix[first_valued, cols]
+        return np.where(sessions > 0, total / sessions, np.nan)
+
+
+def _asof_rates(dates: np.ndarray, series: pd.Series) -> np.ndarray:
+    """
+    Join a daily rate series to session dates: each date takes the latest
+    rate on or before it, if at most FX_ASOF_MAX_DAYS old (else NaN).
+    """
+    series = series.dropna()
+    if series.empty:
+        return np.full(len(dates), np.nan)
+    rate_dates = pd.to_datetime(series.index).values.astype("datetime64[D]")
+    order = np.argsort(rate_dates, kind="stable")
+    rate_dates = rate_dates[order]
+    rates = series.to_numpy(dtype=float)[order]
+    rows = np.searchsorted(rate_dates, dates, side="right") - 1
+    found = rows >= 0
+    age = dates - rate_dates[np.maximum(rows, 0)]
+    usable = found & (age <= np.timedelta64(FX_ASOF_MAX_DAYS, "D"))
+    return np.where(usable, rates[np.maximum(rows, 0)], np.nan)
+
+
+def _optional_float(value: float):
+    return None if np.isnan(value) else float(value)
+
+
+def _optional_round(value: float, digits: int = 2):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def _log_return_prefix(close: np.ndarray):
+    """
+    Per-index session lookup and prefix sums of daily log returns.
+
+    A return is booked on each session that has an earlier session of the
+    same index, so calendar gaps (weekends, holidays, other markets' days)
+    never produce zero returns.
+
+    Returns:
+        (last_session, return_prefix) as documented on PricePanel
+    """
+    n_dates, n_keys = close.shape
+    valid = ~np.isnan(close)
+    rows = np.arange(n_dates)[:, None]
+    last_session = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+
+    # Previous session of the same index, strictly before each row
+    previous = np.full((n_dates, n_keys), -1, dtype=np.int64)
+    previous[1:] = last_session[:-1]
+    has_return = valid & (previous >= 0)
+    cols = np.arange(n_keys)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_return = np.log(close / close[np.maximum(previous, 0), cols])
+    log_return = np.where(has_return, log_return, 0.0)
+
+    return_prefix = np.zeros((3, n_dates + 1, n_keys))
+    np.cumsum(has_return, axis=0, out=return_prefix[0, 1:])
+    np.cumsum(log_return, axis=0, out=return_prefix[1, 1:])
+    np.cumsum(log_return * log_return, axis=0, out=return_prefix[2, 1:])
+    return last_session, return_prefix
+
+
+def _traded_value_prefix(close: np.ndarray, volume: np.ndarray):
+    """
+    Prefix sums of daily traded value (volume x close) in one pass.
+
+    Returns (value_count, value_prefix): per-date counts of valued sessions
+    and, per index, cumulative traded value over its own valued sessions
+    (NaN-padded beyond each index's session count). Sessions without a
+    positive volume are not valued.
+    """
+    n_dates, n_keys = close.shape
+    with np.errstate(invalid="ignore"):
+        value = volume * close
+        valued = ~np.isnan(value) & (volume > 0)
+
+    value_count = np.zeros((n_dates + 1, n_keys), dtype=np.int64)
+    np.cumsum(valued, axis=0, out=value_count[1:])
+
+    # Compact each column's valued sessions to the top, keeping date order
+    counts = value_count[-1]
+    value_prefix = np.full((int(counts.max(initial=0)) + 1, n_keys), np.nan)
+    value_prefix[0] = 0.0
+    order = np.argsort(~valued, axis=0, kind="stable")
+    compact = np.take_along_axis(np.where(valued, value, 0.0), order, axis=0)
+    running = np.cumsum(compact, axis=0)
+    rows = np.arange(1, value_prefix.shape[0])[:, None]
+    value_prefix[1:] = np.where(rows <= counts, running[:value_prefix.shape[0] - 1], np.nan)
+    return value_count, value_prefix
@@ -0,0 +1,151 @@
+"""
+Background pre-warming module.
+Refreshes each index shortly after its own market close, so user requests
+hit a warm cache and history store instead of paying fetch latency.
+
+Run standalone (warms the on-disk history store only):
+    python -m src.prewarm
+"""
+
+import heapq
+import threading
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from .data_fetcher import INDEX_CONFIGS, get_trading_calendar, refresh_index_history
+from .providers import MarketDataProvider
+
+# Minutes after the close before refreshing, so the final print is published
+PREWARM_DELAY_MINUTES = 20
+
+
+def next_refresh_time(index_key: str, now: datetime, delay_minutes: int = PREWARM_DELAY_MINUTES) -> datetime:
+    """
+    Next UTC time after `now` to refresh an index: its market close plus
+    a delay, on the next session of its exchange's trading calendar.
+
+    Args:
+        index_key: Key in INDEX_CONFIGS
+        now: Current time (timezone-aware)
+        delay_minutes: Minutes after the close
+
+    Returns:
+        Timezone-aware UTC datetime
+    """
+    config = INDEX_CONFIGS[index_key]
+    tz = ZoneInfo(config.get("timezone", "UTC"))
+    close_hour, close_minute = (int(part) for part in config.get("market_close", "16:00").split(":"))
+    calendar = get_trading_calendar(index_key)
+
+    local_now = now.astimezone(tz)
+    day = local_now.date()
+    for _ in range(2):
+        session = calendar.first_on_or_after(day)
+        if np.isnat(session):
+            break
+        session_day = session.astype(date)
+        run_at = datetime.combine(session_day, dtime(close_hour, close_minute), tzinfo=tz)
+        run_at += timedelta(minutes=delay_minutes)
+        if run_at > local_now:
+            return run_at.astimezone(timezone.utc)
+        day = session_day + timedelta(days=1)
+    raise ValueError(f"No upcoming trading session found for {index_key}")
+
+
+class PrewarmScheduler(threading.Thread):
+    """
+    Daemon thread refreshing every configured index after its own close.
+
+    Each refresh goes through refresh_index_history, which updates the
+    local history store and the shared in-process cache.
+    """
+
+    def __init__(
+        self,
+        index_keys: List[str] = None,
+        years: List[int] = None,
+        provider: Optional[MarketDataProvider] = None,
+        delay_minutes: int = PREWARM_DELAY_MINUTES,
+        warm_on_start: bool = True,
+    ):
+        """
+        Args:
+            index_keys: Indices to keep warm (default: all configured)
+            years: Years window to sync (default: the dashboard's window)
+            provider: Market data provider (default: the process-wide one)
+            delay_minutes: Minutes after each close before refreshing
+            warm_on_start: Refresh every index once when the thread starts
+        """
+        super().__init__(name="prewarm-scheduler", daemon=True)
+        self.index_keys = index_keys or list(INDEX_CONFIGS.keys())
+        self.years = years
+        self.provider = provider
+        self.delay_minutes = delay_minutes
+        self.warm_on_start = warm_on_start
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._status: Dict[str, Dict] = {key: {} for key in self.index_keys}
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _refresh(self, index_key: str):
+        started = datetime.now(timezone.utc)
+        try:
+            message = refresh_index_history(index_key, self.years, self.provider)
+        except Exception as e:
+            message = f"Error: {str(e)}"
+        with self._lock:
+            self._status[index_key].update({
+                "last_run": started.isoformat(),
+                "last_status": message,
+            })
+
+    def _schedule(self, heap: list, index_key: str, now: datetime):
+        run_at = next_refresh_time(index_key, now, self.delay_minutes)
+        heapq.heappush(heap, (run_at, index_key))
+        with self._lock:
+            self._status[index_key]["next_run"] = run_at.isoformat()
+
+    def run(self):
+        if self.warm_on_start:
+            for index_key in self.index_keys:
+                if self._stop_event.is_set():
+                    return
+                self._refresh(index_key)
+
+        heap = []
+        now = datetime.now(timezone.utc)
+        for index_key in self.index_keys:
+            self._schedule(heap, index_key, now)
+
+        while heap and not self._stop_event.is_set():
+            run_at, index_key = heap[0]
+            wait = (run_at - datetime.now(timezone.utc)).total_seconds()
+            if wait > 0:
+                # Wake up periodically so clock changes cannot stall the loop
+                self._stop_event.wait(min(wait, 300))
+                continue
+            heapq.heappop(heap)
+            self._refresh(index_key)
+            self._schedule(heap, index_key, datetime.now(timezone.utc))
+
+    def status(self) -> Dict[str, Dict]:
+        """Per-index next/last run times and last status message."""
+        with self._lock:
+            return {key: dict(value) for key, value in self._status.items()}
+
+
+if __name__ == "__main__":
+    scheduler = PrewarmScheduler()
+    scheduler.start()
+    try:
+        while scheduler.is_alive():
+            scheduler.join(timeout=60)
+            for key, info in scheduler.status().items():
+                print(f"{key}: next {info.get('next_run', 'N/A')} | last {info.get('last_status', 'N/A')}")
+    except KeyboardInterrupt:
+        scheduler.stop()
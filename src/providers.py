@@ -0,0 +1,304 @@
+"""
+Market data provider module.
+Every index history download and index search goes through a provider,
+so the fetch pipeline can run against Investing.com or recorded fixtures.
+"""
+
+import json
+import random
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TypeVar
+
+import pandas as pd
+
+from .history_store import OHLCV_COLUMNS, history_key
+from .rate_limit import get_rate_limiter
+
+# Try to import investpy
+try:
+    import investpy
+    INVESTPY_AVAILABLE = True
+except ImportError:
+    INVESTPY_AVAILABLE = False
+
+T = TypeVar("T")
+
+
+class ProviderError(Exception):
+    """Custom exception for market data provider failures."""
+    pass
+
+
+def call_with_timeout(fn: Callable[[], T], timeout: Optional[float], what: str) -> T:
+    """
+    Run a blocking call that has no timeout of its own, giving up after
+    `timeout` seconds. The call runs on its own daemon thread, so a hung
+    request is abandoned without holding a worker of any shared pool.
+
+    Raises:
+        TimeoutError: if the call has not finished in time
+    """
+    if timeout is None:
+        return fn()
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=run, name=f"timeout-{what}", daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"{what} timed out after {timeout:.1f}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+class MarketDataProvider:
+    """
+    Base class for market data providers.
+
+    Subclasses implement get_index_history and search_indices. `name` also
+    namespaces the local history store, so providers never share files.
+    """
+
+    name = "base"
+    host: Optional[str] = None
+    unavailable_message = "Market data provider not available"
+
+    def is_available(self) -> bool:
+        return True
+
+    def source_label(self, index_name: str) -> str:
+        """Human-readable data source for the audit trail."""
+        return f"{self.name} ({index_name})"
+
+    def get_index_history(
+        self,
+        index_name: str,
+        country: str,
+        from_date: date,
+        to_date: date,
+        timeout: Optional[float] = None,
+    ) -> pd.DataFrame:
+        """
+        Download daily OHLCV for an inclusive date range, giving up after
+        `timeout` seconds (None waits indefinitely).
+
+        Returns:
+            DataFrame indexed by date with Open/High/Low/Close/Volume columns
+        """
+        raise NotImplementedError
+
+    def search_indices(self, country: str = None) -> List[Dict]:
+        """List indices the provider knows about."""
+        raise NotImplementedError
+
+
+class InvestpyProvider(MarketDataProvider):
+    """Investing.com via investpy, paced by the shared per-host rate limiter."""
+
+    name = "investing.com"
+    host = "investing.com"
+    unavailable_message = "investpy library not installed. Run: pip install investpy"
+
+    def is_available(self) -> bool:
+        return INVESTPY_AVAILABLE
+
+    def source_label(self, index_name: str) -> str:
+        return f"Investing.com ({index_name})"
+
+    def get_index_history(
+        self,
+        index_name: str,
+        country: str,
+        from_date: date,
+        to_date: date,
+        timeout: Optional[float] = None,
+    ) -> pd.DataFrame:
+        get_rate_limiter(self.host).acquire()
+        # investpy has no timeout parameter; bound the wait instead
+        return call_with_timeout(
+            lambda: investpy.get_index_historical_data(
+                index=index_name,
+                country=country,
+                from_date=from_date.strftime("%d/%m/%Y"),
+                to_date=to_date.strftime("%d/%m/%Y")
+            ),
+            timeout,
+            f"Investing.com request for {index_name}",
+        )
+
+    def search_indices(self, country: str = None) -> List[Dict]:
+        if country:
+            indices = investpy.get_indices(country=country)
+        else:
+            indices = investpy.get_indices_list(country="united states")
+        return indices.to_dict('records') if hasattr(indices, 'to_dict') else []
+
+
+class FixtureProvider(MarketDataProvider):
+    """
+    Replays recorded OHLCV from a directory, with simulated latency and
+    failures for offline benchmarks and load tests.
+
+    Files are named like the history store (`<history_key>.csv` or
+    `.parquet`), so a history store directory can be replayed directly.
+    An optional `manifest.json` lists {"name", "country"} for search.
+    """
+
+    name = "fixture"
+    unavailable_message = "Fixture directory not found"
+
+    def __init__(
+        self,
+        fixture_dir: Path,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            fixture_dir: Directory holding recorded series
+            latency: Base seconds to sleep per request
+            jitter: Extra uniformly-distributed seconds per request
+            failure_rate: Probability (0-1) that a request fails
+            seed: Random seed for reproducible latency/failure sequences
+        """
+        if not 0.0 <= failure_rate <= 1.0:
+            raise ValueError("failure_rate must be between 0 and 1")
+        self.fixture_dir = Path(fixture_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._cache: Dict[str, pd.DataFrame] = {}
+        self._cache_lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        return self.fixture_dir.is_dir()
+
+    def source_label(self, index_name: str) -> str:
+        return f"Fixture ({index_name})"
+
+    def _simulate_request(self, what: str, timeout: Optional[float] = None):
+        with self._rng_lock:
+            delay = self.latency + self._rng.uniform(0.0, self.jitter)
+            failed = self._rng.random() < self.failure_rate
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Simulated request for {what} timed out after {timeout:.1f}s")
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            raise ConnectionError(f"Simulated connection failure for {what}")
+
+    def _load(self, key: str) -> pd.DataFrame:
+        with self._cache_lock:
+            if key in self._cache:
+                return self._cache[key]
+
+        parquet_path = self.fixture_dir / f"{key}.parquet"
+        csv_path = self.fixture_dir / f"{key}.csv"
+        if parquet_path.exists():
+            df = pd.read_parquet(parquet_path)
+        elif csv_path.exists():
+            df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        else:
+            raise ProviderError(f"Index fixture '{key}' not found in {self.fixture_dir}")
+        df.index = pd.DatetimeIndex(df.index, name="Date")
+        df = df.sort_index()
+
+        with self._cache_lock:
+            self._cache[key] = df
+        return df
+
+    def get_index_history(
+        self,
+        index_name: str,
+        country: str,
+        from_date: date,
+        to_date: date,
+        timeout: Optional[float] = None,
+    ) -> pd.DataFrame:
+        self._simulate_request(index_name, timeout)
+        df = self._load(history_key(index_name, country))
+        return df.loc[pd.Timestamp(from_date):pd.Timestamp(to_date)].copy()
+
+    def search_indices(self, country: str = None) -> List[Dict]:
+        self._simulate_request("index search")
+        manifest_path = self.fixture_dir / "manifest.json"
+        if not manifest_path.exists():
+            return []
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        if country:
+            entries = [e for e in entries if e.get("country", "").lower() == country.lower()]
+        return entries
+
+
+def record_fixtures(
+    source: MarketDataProvider,
+    indices: List[Dict],
+    fixture_dir: Path,
+    from_date: date,
+    to_date: date,
+) -> Dict[str, str]:
+    """
+    Record index histories from a live provider into a fixture directory.
+
+    Args:
+        source: Provider to download from
+        indices: List of {"name": ..., "country": ...} entries
+        fixture_dir: Output directory (created if missing)
+        from_date: First date to record
+        to_date: Last date to record
+
+    Returns:
+        Dict of index name -> status message
+    """
+    fixture_dir = Path(fixture_dir)
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+
+    statuses = {}
+    manifest = []
+    for entry in indices:
+        try:
+            df = source.get_index_history(entry["name"], entry["country"], from_date, to_date)
+            df = df[[c for c in OHLCV_COLUMNS if c in df.columns]]
+            df.to_csv(fixture_dir / f"{history_key(entry['name'], entry['country'])}.csv")
+            manifest.append({"name": entry["name"], "country": entry["country"]})
+            statuses[entry["name"]] = f"Recorded {len(df)} rows"
+        except Exception as e:
+            statuses[entry["name"]] = f"Error: {str(e)}"
+
+    with open(fixture_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return statuses
+
+
+_provider: MarketDataProvider = InvestpyProvider()
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> MarketDataProvider:
+    """Get the process-wide market data provider."""
+    with _provider_lock:
+        return _provider
+
+
+def set_provider(provider: MarketDataProvider):
+    """Replace the process-wide market data provider (e.g. with fixtures)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -0,0 +1,142 @@
+"""
+Data quality module.
+Vectorized checks over fetched price histories: missing trading days,
+flat-lined prices, zero volumes, outlier returns and unordered dates.
+"""
+
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .calendars import TradingCalendar, build_calendar
+
+# Consecutive sessions with an unchanged close before a series counts as flat-lined
+FLAT_RUN_SESSIONS = 5
+
+# Daily log returns further than this many standard deviations from the mean are outliers
+OUTLIER_Z_SCORE = 5.0
+
+# Minimum returns in a period before outliers are scored
+MIN_RETURNS_FOR_OUTLIERS = 20
+
+# Share of expected sessions that may be missing. Calendars only know
+# fixed-date holidays, so moving ones (Lunar New Year, Eid, Easter) count
+# as missing and can reach ~7% of a short early-year period
+MISSING_SESSIONS_TOLERANCE = 0.10
+
+
+def count_date_issues(index: pd.Index) -> Dict[str, int]:
+    """
+    Count duplicated and out-of-order dates in a raw downloaded series.
+
+    Returns:
+        Dict with duplicate_dates and unordered_dates
+    """
+    if len(index) < 2:
+        return {"duplicate_dates": 0, "unordered_dates": 0}
+    steps = np.diff(pd.DatetimeIndex(index).values.astype("datetime64[D]").astype(np.int64))
+    return {
+        "duplicate_dates": int((steps == 0).sum()),
+        "unordered_dates": int((steps < 0).sum()),
+    }
+
+
+def scan_panel(panel, start: date, end: date, calendars: Dict[str, TradingCalendar] = None) -> Dict[str, np.ndarray]:
+    """
+    Run every check over all indices of a PricePanel for an inclusive range.
+
+    Args:
+        panel: PricePanel with the fetched histories
+        start: First date of the period
+        end: Last date of the period
+        calendars: Index key -> its exchange's trading calendar
+            (weekdays without holidays if missing)
+
+    Returns:
+        Dict of arrays (one entry per key): expected_sessions,
+        missing_sessions, max_flat_sessions, zero_volume_sessions,
+        outlier_returns, fx_missing_sessions
+    """
+    calendars = calendars or {}
+    n_keys = len(panel.keys)
+    lo = np.searchsorted(panel.dates, np.datetime64(start, "D"), side="left")
+    hi = np.searchsorted(panel.dates, np.datetime64(end, "D"), side="right")
+    close = panel.close[lo:hi]
+    volume = panel.volume[lo:hi]
+    dates = panel.dates[lo:hi]
+    valid = ~np.isnan(close)
+    cols = np.arange(n_keys)
+
+    # Missing sessions: calendar sessions from the period start to each
+    # index's last session, so gaps at the start of the period count too
+    expected = np.zeros(n_keys, dtype=np.int64)
+    has_data = valid.any(axis=0)
+    if len(dates):
+        last = dates[len(dates) - 1 - np.argmax(valid[::-1], axis=0)]
+        key_calendars = [calendars.get(key) or build_calendar() for key in panel.keys]
+        for calendar in set(key_calendars):
+            mask = np.array([key_calendar is calendar for key_calendar in key_calendars])
+            counts = calendar.count(np.datetime64(start, "D"), last)
+            expected = np.where(mask & has_data, counts, expected)
+    missing = np.maximum(expected - valid.sum(axis=0), 0)
+
+    # Flat-lined prices: longest run of sessions repeating the previous close
+    prior_rows = np.arange(lo, hi) - 1
+    previous = np.where(prior_rows[:, None] >= 0, panel.last_session[np.maximum(prior_rows, 0)], -1)
+    prev_close = np.where(previous >= 0, panel.close[np.maximum(previous, 0), cols], np.nan)
+    flat = valid & (close == prev_close)
+    run_id = np.cumsum(valid & ~flat, axis=0)
+    max_flat = np.zeros(n_keys, dtype=np.int64)
+    flat_rows, flat_cols = np.nonzero(flat)
+    if len(flat_rows):
+        runs, run_lengths = np.unique(
+            np.stack([flat_cols, run_id[flat_rows, flat_cols]]), axis=1, return_counts=True
+        )
+        np.maximum.at(max_flat, runs[0], run_lengths)
+
+    # Zero volumes, only where the source reports volume at all
+    reports_volume = (np.nan_to_num(volume) > 0).any(axis=0)
+    zero_volume = np.where(reports_volume, (valid & (volume == 0)).sum(axis=0), 0)
+
+    # Outlier returns by z-score within the period
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_return = np.log(close / prev_close)
+        returns_valid = ~np.isnan(log_return)
+        n_returns = returns_valid.sum(axis=0)
+        mean = np.where(returns_valid, log_return, 0.0).sum(axis=0) / n_returns
+        std = np.sqrt(np.where(returns_valid, (log_return - mean) ** 2, 0.0).sum(axis=0) / (n_returns - 1))
+        z_score = np.abs(log_return - mean) / std
+    outliers = (returns_valid & (z_score > OUTLIER_Z_SCORE)).sum(axis=0)
+    outliers = np.where(n_returns >= MIN_RETURNS_FOR_OUTLIERS, outliers, 0)
+
+    return {
+        "expected_sessions": expected,
+        "missing_sessions": missing,
+        "max_flat_sessions": max_flat,
+        "zero_volume_sessions": zero_volume,
+        "outlier_returns": outliers,
+        "fx_missing_sessions": panel.fx_missing_sessions(lo, hi),
+    }
+
+
+def quality_flags(report: Dict) -> List[str]:
+    """Human-readable warnings for one index's quality report (empty if clean)."""
+    flags = []
+    expected = report.get("expected_sessions", 0)
+    if expected and report.get("missing_sessions", 0) > expected * MISSING_SESSIONS_TOLERANCE:
+        flags.append(f"{report['missing_sessions']} of {expected} trading days missing")
+    if report.get("max_flat_sessions", 0) >= FLAT_RUN_SESSIONS:
+        flags.append(f"Close unchanged for {report['max_flat_sessions']} consecutive sessions")
+    if report.get("zero_volume_sessions", 0):
+        flags.append(f"{report['zero_volume_sessions']} sessions with zero volume")
+    if report.get("outlier_returns", 0):
+        flags.append(f"{report['outlier_returns']} outlier daily returns (|z| > {OUTLIER_Z_SCORE:g})")
+    if report.get("fx_missing_sessions", 0):
+        flags.append(f"No daily FX rate for {report['fx_missing_sessions']} sessions; daily-FX ADTV omitted")
+    if report.get("duplicate_dates", 0):
+        flags.append(f"{report['duplicate_dates']} duplicated dates in downloaded data")
+    if report.get("unordered_dates", 0):
+        flags.append(f"{report['unordered_dates']} out-of-order dates in downloaded data")
+    return flags
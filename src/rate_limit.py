@@ -0,0 +1,81 @@
+"""
+Rate limiting module for outbound requests.
+Token-bucket limiters keyed by upstream host, shared across worker threads.
+"""
+
+import threading
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    Each request consumes one token; callers block until one is available.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens if available.
+
+        Returns:
+            0.0 if the tokens were taken, otherwise seconds to wait before retrying
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until tokens are available, then take them."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+# Default politeness per upstream host: (requests per second, burst size)
+DEFAULT_HOST_LIMITS = {
+    "investing.com": (3.0, 3.0),
+}
+DEFAULT_LIMIT = (5.0, 5.0)
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(host: str) -> TokenBucket:
+    """Get (or create) the shared token bucket for an upstream host."""
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            rate, capacity = DEFAULT_HOST_LIMITS.get(host, DEFAULT_LIMIT)
+            limiter = TokenBucket(rate, capacity)
+            _limiters[host] = limiter
+        return limiter
+
+
+def set_rate_limit(host: str, rate: float, capacity: float):
+    """Override the rate limit for a host (replaces any existing bucket)."""
+    with _limiters_lock:
+        DEFAULT_HOST_LIMITS[host] = (rate, capacity)
+        _limiters[host] = TokenBucket(rate, capacity)
@@ -0,0 +1,268 @@
+"""
+Upstream resilience module.
+Per-source circuit breakers and latency-adaptive timeouts, so a degraded
+upstream fails fast to the next fallback instead of stalling every request.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the source's breaker is open."""
+    pass
+
+
+class UpstreamError(Exception):
+    """Raised by callers for a server-side upstream failure (e.g. HTTP 5xx)."""
+    pass
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """
+    Whether an error says the upstream itself is unhealthy: transport errors
+    (connection, timeout) and server errors count; client errors such as an
+    unknown index name or an HTTP 4xx other than 429 do not.
+    """
+    if isinstance(error, UpstreamError):
+        return True
+    if not isinstance(error, OSError):
+        return False
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status is None or status >= 500 or status == 429
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed: calls pass; `failure_threshold` consecutive failures open it.
+    open: calls are rejected until `reset_timeout` seconds have passed.
+    half_open: one trial call passes; success closes, failure re-opens.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now."""
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = "half_open"
+                self._trial_in_flight = False
+            # half_open: let a single trial call through
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call that neither proved nor disproved health (e.g. a client error)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.trips += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    @property
+    def consecutive_failures(self) -> int:
+        with self._lock:
+            return self._failures
+
+
+class AdaptiveTimeout:
+    """
+    Timeout derived from recently observed latencies.
+
+    Until `min_samples` successful calls are seen, `max_timeout` is used.
+    Afterwards the timeout is the `percentile` latency times `multiplier`,
+    clamped to [min_timeout, max_timeout].
+    """
+
+    def __init__(
+        self,
+        max_timeout: float,
+        min_timeout: float = 1.0,
+        percentile: float = 95.0,
+        multiplier: float = 2.0,
+        window: int = 50,
+        min_samples: int = 5,
+    ):
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Observed latency at a percentile (nearest rank), or None if no samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = min(len(samples) - 1, max(0, int(round(percentile / 100 * len(samples))) - 1))
+        return samples[rank]
+
+    def current(self) -> float:
+        with self._lock:
+            count = len(self._samples)
+        if count < self.min_samples:
+            return self.max_timeout
+        observed = self.latency_percentile(self.percentile)
+        return min(self.max_timeout, max(self.min_timeout, observed * self.multiplier))
+
+
+class UpstreamSource:
+    """
+    A named upstream with its own breaker, adaptive timeout and counters.
+
+    Calls of a different `kind` (e.g. "backfill") keep separate latency
+    stats, so large requests never run on a timeout learned from small ones;
+    "backfill" calls always get the full `max_timeout`.
+    """
+
+    def __init__(self, name: str, max_timeout: float = 10.0, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.timeout = AdaptiveTimeout(max_timeout)
+        # kind -> timeout for calls other than the default kind
+        self.timeouts: Dict[str, AdaptiveTimeout] = {
+            "backfill": AdaptiveTimeout(max_timeout, min_timeout=max_timeout),
+        }
+        self._lock = threading.Lock()
+        self._counts = {"calls": 0, "failures": 0, "client_errors": 0, "rejected": 0}
+
+    def timeout_for(self, kind: str = "default") -> AdaptiveTimeout:
+        """Adaptive timeout (and latency stats) of one kind of call."""
+        if kind == "default":
+            return self.timeout
+        with self._lock:
+            timeout = self.timeouts.get(kind)
+            if timeout is None:
+                timeout = self.timeouts[kind] = AdaptiveTimeout(self.timeout.max_timeout)
+            return timeout
+
+    def call(self, fn: Callable[[float], T], kind: str = "default") -> T:
+        """
+        Run fn(timeout_seconds) through the breaker, with the timeout of
+        the given kind of call.
+
+        Raises:
+            CircuitOpenError: if the breaker is open
+            Any exception raised by fn; only upstream failures (see
+            is_upstream_failure) count toward opening the breaker
+        """
+        if not self.breaker.allow():
+            with self._lock:
+                self._counts["rejected"] += 1
+            raise CircuitOpenError(f"{self.name} circuit open - failing fast")
+
+        with self._lock:
+            self._counts["calls"] += 1
+        timeout = self.timeout_for(kind)
+        started = time.monotonic()
+        try:
+            result = fn(timeout.current())
+        except Exception as e:
+            if not is_upstream_failure(e):
+                with self._lock:
+                    self._counts["client_errors"] += 1
+                self.breaker.release()
+                raise
+            with self._lock:
+                self._counts["failures"] += 1
+            self.breaker.record_failure()
+            raise
+        timeout.observe(time.monotonic() - started)
+        self.breaker.record_success()
+        return result
+
+    def snapshot(self) -> Dict:
+        """State and counters for the audit trail."""
+        with self._lock:
+            counts = dict(self._counts)
+        p50 = self.timeout.latency_percentile(50)
+        p95 = self.timeout.latency_percentile(95)
+        return {
+            "source": self.name,
+            "state": self.breaker.state,
+            "trips": self.breaker.trips,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "calls": counts["calls"],
+            "failures": counts["failures"],
+            "client_errors": counts["client_errors"],
+            "rejected": counts["rejected"],
+            "p50_latency_s": round(p50, 3) if p50 is not None else None,
+            "p95_latency_s": round(p95, 3) if p95 is not None else None,
+            "timeout_s": round(self.timeout.current(), 2),
+        }
+
+
+# Upper bound on timeouts per source (seconds); the adaptive value never exceeds it
+SOURCE_MAX_TIMEOUTS = {
+    "exchangerate.host": 10.0,
+    "frankfurter.app": 10.0,
+    "investing.com": 30.0,
+}
+DEFAULT_MAX_TIMEOUT = 15.0
+
+_sources: Dict[str, UpstreamSource] = {}
+_sources_lock = threading.Lock()
+
+
+def get_source(name: str) -> UpstreamSource:
+    """Get (or create) the shared resilience state for an upstream source."""
+    with _sources_lock:
+        source = _sources.get(name)
+        if source is None:
+            source = UpstreamSource(name, SOURCE_MAX_TIMEOUTS.get(name, DEFAULT_MAX_TIMEOUT))
+            _sources[name] = source
+        return source
+
+
+def get_source_states() -> List[Dict]:
+    """Snapshots of every upstream source seen so far."""
+    with _sources_lock:
+        sources = list(_sources.values())
+    return [source.snapshot() for source in sources]
@@ -5,7 +5,7 @@ Ensures type safety and validation for all data structures.
 
 from dataclasses import dataclass, field
 from datetime import datetime, date
-from typing import Optional, Literal
+from typing import NamedTuple, Optional, Literal
 from pydantic import BaseModel, Field, validator
 from enum import Enum
 
@@ -66,6 +66,22 @@ class FXRate(BaseModel):
         use_enum_values = True
 
 
+class RateRecord(NamedTuple):
+    """
+    Immutable, tuple-backed FX rate used internally (no validation, no
+    per-instance dict). Convert with to_model() at I/O boundaries.
+    """
+    base_currency: str
+    quote_currency: str
+    rate: float
+    source: str
+    timestamp: datetime
+
+    def to_model(self) -> FXRate:
+        """Validated FXRate for export or display."""
+        return FXRate(**self._asdict())
+
+
 class ExchangeOutput(BaseModel):
     """Output model with USD-converted values."""
     region: str